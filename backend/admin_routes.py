@@ -1,16 +1,16 @@
 """Admin routes: users/projects management and basic analytics."""
+import asyncio
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional, Dict, Any
-from .services.user_service import verify_token, hash_password
+from .services.user_service import verify_token, hash_password, users_by_id
+from .auth import extract_bearer_token
 from .persistence import load_users_db, save_users_db, load_projects_db, save_projects_db
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
 def require_admin(authorization: Optional[str]) -> Dict[str, Any]:
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid token")
-    token = authorization.split(" ")[1]
+    token = extract_bearer_token(authorization)
     token_data = verify_token(token)
     if not token_data:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -50,14 +50,17 @@ async def create_user(
     if email in users:
         raise HTTPException(status_code=400, detail="User already exists")
     uid = __import__("uuid").uuid4().hex
+    # scrypt takes tens of ms; keep it off the event loop as signup does
+    hashed = await asyncio.to_thread(hash_password, password)
     users[email] = {
         "user_id": uid,
         "email": email,
-        "password": hash_password(password),
+        "password": hashed,
         "name": name,
         "role": role,
         "created_at": __import__("datetime").datetime.utcnow().isoformat()
     }
+    users_by_id[uid] = users[email]
     save_users_db(users)
     return {"status": "created", "user_id": uid}
 
@@ -78,7 +81,7 @@ async def update_user(
     if "role" in body:
         users[key]["role"] = str(body["role"]).lower()
     if "password" in body and body["password"]:
-        users[key]["password"] = hash_password(str(body["password"]))
+        users[key]["password"] = await asyncio.to_thread(hash_password, str(body["password"]))
     save_users_db(users)
     return {"status": "updated"}
 
@@ -90,7 +93,8 @@ async def delete_user(email: str, authorization: Optional[str] = Header(None)):
     key = email.strip().lower()
     if key not in users:
         raise HTTPException(status_code=404, detail="User not found")
-    users.pop(key)
+    removed = users.pop(key)
+    users_by_id.pop(removed["user_id"], None)
     save_users_db(users)
     return {"status": "deleted"}
 
@@ -1,4 +1,5 @@
 """Repository analysis and intelligent preprocessing module."""
+import asyncio
 import os
 import json
 import re
@@ -91,6 +92,13 @@ class RepositoryAnalyzer:
         ],
     }
     
+    # Configuration files looked up by name
+    CONFIG_FILES = [
+        'requirements.txt', 'package.json', 'pyproject.toml', 'setup.py',
+        'Dockerfile', '.env', '.env.example', 'config.yaml', 'config.json',
+        'pom.xml', 'build.gradle', 'go.mod', 'Cargo.toml', 'tsconfig.json'
+    ]
+    
     # Skip patterns
     SKIP_PATTERNS = {
         'node_modules', '.git', '__pycache__', '.venv', 'venv',
@@ -358,14 +366,8 @@ class RepositoryAnalyzer:
     
     def _find_config_files(self) -> List[str]:
         """Find configuration files."""
-        config_patterns = [
-            'requirements.txt', 'package.json', 'pyproject.toml', 'setup.py',
-            'Dockerfile', '.env', '.env.example', 'config.yaml', 'config.json',
-            'pom.xml', 'build.gradle', 'go.mod', 'Cargo.toml', 'tsconfig.json'
-        ]
-        
         config_files: List[str] = []
-        for pattern in config_patterns:
+        for pattern in self.CONFIG_FILES:
             matches = list(self.repo_path.rglob(pattern))
             for f in matches:
                 if not self._should_skip(f):
@@ -559,3 +561,14 @@ class RepositoryAnalyzer:
             if skip_pattern in path_str:
                 return True
         return False
+
+
+def analyze_directory(repo_path: str) -> Tuple[RepositoryMetadata, List[CodeChunk]]:
+    """Analyze a repository synchronously and return (metadata, code_chunks).
+
+    Module-level so it can be submitted to a process pool; both results are
+    plain dataclasses and pickle back to the caller.
+    """
+    analyzer = RepositoryAnalyzer(repo_path)
+    metadata = asyncio.run(analyzer.analyze())
+    return metadata, analyzer.code_chunks
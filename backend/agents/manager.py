@@ -1,6 +1,6 @@
 import asyncio
 from . import ingest, metadata, summarizer, docgen, observability
-job_controls = {}
+job_controls = {}  # job_id -> asyncio.Event, set while the job may run
 
 agents = {
     'ingest': ingest,
@@ -15,21 +15,42 @@ async def run_agent(name, job_id, payload):
     if not module:
         raise RuntimeError(f'Unknown agent: {name}')
     # check pause flag
-    await _wait_if_paused(job_id)
+    await wait_if_paused(job_id)
     return await module.run(job_id, payload)
 
+async def run_agent_batch(name, items):
+    """Run an agent over (job_id, payload) items, returning results in order.
+
+    Items may come from different jobs. Agents exposing run_batch(items) get
+    the whole batch in one call; others are run once per item, concurrently.
+    Pause flags are checked by the caller before items are queued.
+    """
+    module = agents.get(name)
+    if not module:
+        raise RuntimeError(f'Unknown agent: {name}')
+    run_batch = getattr(module, 'run_batch', None)
+    if run_batch is not None:
+        return await run_batch(items)
+    return await asyncio.gather(*(module.run(job_id, p) for job_id, p in items))
+
 async def get_mermaid(job_id):
     # Ask docgen agent to return mermaid
     return await docgen.get_mermaid(job_id)
 
 async def pause_job(job_id):
-    job_controls[job_id] = {'paused': True}
+    job_controls.setdefault(job_id, asyncio.Event()).clear()
 
 async def resume_job(job_id):
-    job_controls[job_id] = {'paused': False}
+    running = job_controls.get(job_id)
+    if running is not None:
+        running.set()
+
+def clear_job(job_id):
+    """Forget a finished job's pause state."""
+    job_controls.pop(job_id, None)
 
-async def _wait_if_paused(job_id):
-    import time
-    while job_controls.get(job_id, {}).get('paused', False):
-        await asyncio.sleep(0.5)
-        # continue waiting until resumed
+async def wait_if_paused(job_id):
+    # the job's event is cleared while paused; resume_job wakes waiters at once
+    running = job_controls.get(job_id)
+    if running is not None:
+        await running.wait()
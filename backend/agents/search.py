@@ -1,4 +1,5 @@
 """Semantic search and code discovery module."""
+import heapq
 from typing import List, Dict, Tuple
 from .analyzer import CodeChunk
 
@@ -9,6 +10,11 @@ class SemanticSearchEngine:
     def __init__(self, code_chunks: List[CodeChunk]):
         self.code_chunks = code_chunks
         self.index = self._build_index()
+        self._lowered = self._build_lowered()
+    
+    def _build_lowered(self) -> List[Tuple[CodeChunk, str, str]]:
+        """Lower-case chunk names and contents once for substring matching."""
+        return [(chunk, (chunk.name or "").lower(), chunk.content.lower()) for chunk in self.code_chunks]
     
     def _build_index(self) -> Dict[str, List[CodeChunk]]:
         """Build search index from code chunks."""
@@ -62,6 +68,8 @@ class SemanticSearchEngine:
         
         # Find matching chunks
         matches = {}
+        # Engines unpickled from an older cache entry lack the lowered copies
+        lowered = getattr(self, '_lowered', None) or self._build_lowered()
         
         for term in query_terms:
             # Direct index lookup
@@ -73,27 +81,27 @@ class SemanticSearchEngine:
                     matches[chunk_id]['score'] += 2.0
             
             # Fuzzy matching in chunk names and content
-            for chunk in self.code_chunks:
+            for chunk, name_lower, content_lower in lowered:
                 chunk_id = chunk.chunk_id
                 
                 # Name matching
-                if chunk.name and term in chunk.name.lower():
+                if name_lower and term in name_lower:
                     if chunk_id not in matches:
                         matches[chunk_id] = {'chunk': chunk, 'score': 0}
                     matches[chunk_id]['score'] += 1.5
                 
                 # Content matching
-                if term in chunk.content.lower():
+                if term in content_lower:
                     if chunk_id not in matches:
                         matches[chunk_id] = {'chunk': chunk, 'score': 0}
                     matches[chunk_id]['score'] += 1.0
         
-        # Sort by score and return top N
-        sorted_matches = sorted(matches.items(), key=lambda x: x[1]['score'], reverse=True)
+        # Select top N by score (same order as a full stable sort)
+        top_matches = heapq.nlargest(limit, matches.items(), key=lambda x: x[1]['score'])
         
         # Convert to dict format
         results = []
-        for _, match_data in sorted_matches[:limit]:
+        for _, match_data in top_matches:
             chunk = match_data['chunk']
             results.append({
                 'file_path': chunk.file_path,
@@ -1,23 +1,265 @@
 """Analysis routes for code understanding and discovery."""
-from fastapi import APIRouter, HTTPException, Header
-from typing import Optional, List
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import traceback
+from datetime import datetime
+from urllib.parse import quote
+from collections import OrderedDict, deque
+from fastapi import APIRouter, HTTPException, Header, Request
+from fastapi.responses import Response
+from typing import Any, Callable, Dict, Optional, List
 from .schemas import UserRole
-from .services.user_service import verify_token, get_project
-from .agents.analyzer import RepositoryAnalyzer, CodeChunk
+from .services.user_service import (
+    verify_token, get_project,
+    ACTIVITY_FEED_MAXLEN, QNA_MAXLEN, USER_CONTEXT_MAXLEN
+)
+from .auth import extract_bearer_token
+from .agents.analyzer import RepositoryAnalyzer, CodeChunk, analyze_directory
 from .agents.search import SemanticSearchEngine
+from .utils.archive import extract_zip, file_sha256
+from .utils.http_client import ARCHIVE_SPOOL_SIZE, download_github_archive
+from .utils.responses import FastJSONResponse
+from .persistence import load_analysis_cache, save_analysis_cache
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
-# Cache for analyzed projects (project_id -> (metadata, chunks, search_engine))
-_analysis_cache = {}
+# Cache for analyzed projects (project_id -> (stored_at, (metadata, chunks, search_engine))).
+# Each entry pins the chunks and search index, so the cache is bounded: it
+# evicts the least recently used project once it grows past the limit, and
+# drops entries older than the TTL (they are reloaded from the disk cache).
+_MAX_CACHED_PROJECTS = int(os.getenv("MAX_CACHED_PROJECTS", 16))
+_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 3600))
+_analysis_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+# Cold analyses currently running, so concurrent misses share one (project_id -> task)
+_inflight: Dict[str, "asyncio.Task"] = {}
+
+# ETags of responses derived from a cache entry (project_id -> {response_key: etag}).
+# They stay valid until the project's cache entry is replaced or evicted. Keys
+# come from query parameters, so each project keeps only the most recently
+# used _MAX_RESPONSE_ETAGS of them.
+_MAX_RESPONSE_ETAGS = 32
+_response_etags: Dict[str, "OrderedDict[str, str]"] = {}
+
+# chunk_id -> chunk lookups, built on first use and dropped with the ETags
+_chunk_indexes: Dict[str, Dict[str, CodeChunk]] = {}
+
+
+def _cache_get(project_id: str) -> Optional[tuple]:
+    """Return the cached analysis for a project and mark it recently used."""
+    item = _analysis_cache.get(project_id)
+    if item is None:
+        return None
+    stored_at, entry = item
+    if time.monotonic() - stored_at > _CACHE_TTL:
+        del _analysis_cache[project_id]
+        _response_etags.pop(project_id, None)
+        _chunk_indexes.pop(project_id, None)
+        return None
+    _analysis_cache.move_to_end(project_id)
+    return entry
+
+
+def _cache_put(project_id: str, entry: tuple) -> None:
+    """Cache an analysis result, evicting the oldest entries past the limit."""
+    _analysis_cache[project_id] = (time.monotonic(), entry)
+    _analysis_cache.move_to_end(project_id)
+    _response_etags.pop(project_id, None)
+    _chunk_indexes.pop(project_id, None)
+    while len(_analysis_cache) > _MAX_CACHED_PROJECTS:
+        evicted_id, _ = _analysis_cache.popitem(last=False)
+        _response_etags.pop(evicted_id, None)
+        _chunk_indexes.pop(evicted_id, None)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _conditional_response(
+    project_id: str,
+    response_key: str,
+    if_none_match: Optional[str],
+    build_payload: Callable[[], Dict[str, Any]]
+) -> Response:
+    """Return 304 if the client's ETag is current, else the JSON payload.
+
+    The ETag is computed once per cache entry, so repeat polls skip building
+    and encoding the payload entirely.
+    """
+    etags = _response_etags.setdefault(project_id, OrderedDict())
+    etag = etags.get(response_key)
+    if etag is not None:
+        etags.move_to_end(response_key)
+    if etag and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Encode once; the ETag is the hash of the exact bytes sent
+    response = FastJSONResponse(build_payload(), headers={"Cache-Control": "private, max-age=60"})
+    if etag is None:
+        etag = f'"{hashlib.sha256(response.body).hexdigest()}"'
+        etags[response_key] = etag
+        if len(etags) > _MAX_RESPONSE_ETAGS:
+            etags.popitem(last=False)
+    response.headers["ETag"] = etag
+    return response
+
+
+def _metadata_payload(project_id: str, metadata) -> Dict[str, Any]:
+    return {
+        "project_id": project_id,
+        "repo_type": metadata.repo_type,
+        "frameworks": metadata.frameworks,
+        "entry_points": metadata.entry_points,
+        "important_files": metadata.important_files,
+        "important_files_with_types": metadata.important_files_with_types or [],
+        "dependencies": metadata.dependencies,
+        "config_files": metadata.config_files,
+        "total_files": metadata.total_files,
+        "code_files": metadata.code_files,
+        "total_code_chunks": metadata.total_code_chunks,
+        "confidence_score": metadata.confidence_score
+    }
+
+
+async def _analyze_in_pool(request: Request, repo_dir: str) -> tuple:
+    """Run the analyzer in the app's CPU process pool, keeping the event loop free."""
+    pool = getattr(request.app.state, "cpu_pool", None)
+    return await asyncio.get_running_loop().run_in_executor(pool, analyze_directory, repo_dir)
+
+
+async def _load_or_analyze(project_id: str, project: dict, request: Request) -> tuple:
+    """Return (metadata, chunks, search_engine) for a project missing from the cache.
+
+    Concurrent misses for the same project wait on a single analysis.
+    """
+    task = _inflight.get(project_id)
+    if task is None:
+        task = asyncio.ensure_future(_analyze_project(project_id, project, request))
+        _inflight[project_id] = task
+        task.add_done_callback(lambda _: _inflight.pop(project_id, None))
+    # Shielded so one client disconnecting does not cancel the others' analysis
+    return await asyncio.shield(task)
+
+
+async def _completed_analysis(project_id: str, project: dict, request: Request) -> Optional[tuple]:
+    """Return the project's analysis, or None while it is still running.
+
+    A completed project whose entry expired or was evicted is reloaded
+    (normally from the disk cache) instead of being reported as unfinished.
+    """
+    cached = _cache_get(project_id)
+    if cached is None and project.get("status") == "completed":
+        cached = await _load_or_analyze(project_id, project, request)
+    return cached
+
+
+async def _analyze_project(project_id: str, project: dict, request: Request) -> tuple:
+    """Fetch the repository archive and analyze it, reusing the disk cache."""
+    repo_url = project.get("repository_url", "")
+    local_file_path = project.get("local_file_path")
+    
+    if not repo_url and not local_file_path:
+        raise ValueError("No repository URL or file provided")
+    
+    print(f"[ANALYSIS] Starting analysis for project {project_id}")
+    print(f"[ANALYSIS] Repository URL: {repo_url}")
+    print(f"[ANALYSIS] Local file path: {local_file_path}")
+    
+    # Download and extract the repository as ZIP
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE, dir=temp_dir) as spool:
+        zip_path = None
+        digest = None
+        
+        # Handle uploaded ZIP files (use local path directly)
+        if local_file_path:
+            zip_path = local_file_path
+            print(f"[ANALYSIS] Using uploaded ZIP: {zip_path}")
+            if not os.path.exists(zip_path):
+                raise ValueError(f"ZIP file not found: {zip_path}")
+        
+        # Handle file:// URLs (uploaded ZIPs)
+        elif repo_url.startswith("file://"):
+            # Remove file:// prefix and handle Windows paths
+            zip_path = repo_url[7:]  # Remove "file://" prefix
+            # If path starts with single slash on Windows, it's actually a UNC path
+            # Remove leading slash if it's Windows-style absolute path
+            if zip_path.startswith("/") and len(zip_path) > 2 and zip_path[2] == ":":
+                zip_path = zip_path[1:]
+            print(f"[ANALYSIS] Using uploaded ZIP: {zip_path}")
+            if not os.path.exists(zip_path):
+                raise ValueError(f"ZIP file not found: {zip_path}")
+        
+        # Handle GitHub URLs
+        elif "github.com" in repo_url:
+            # Stream the archive through the shared client (main, then master)
+            try:
+                print(f"[ANALYSIS] Downloading repository...")
+                _, digest = await download_github_archive(repo_url, spool)
+                zip_path = spool
+            
+            except Exception as download_err:
+                print(f"[ANALYSIS] Download error: {download_err}")
+                raise
+        else:
+            raise ValueError(f"Unsupported repository URL format: {repo_url}")
+        
+        # Reuse a persisted analysis of the same archive contents. Hashing,
+        # unpickling, extraction and indexing all block, so they run in
+        # worker threads like the background analysis in user_service.
+        if digest is None:
+            digest = (local_file_path and project.get("content_sha256")) or await asyncio.to_thread(file_sha256, zip_path)
+        cached = await asyncio.to_thread(load_analysis_cache, project_id, digest)
+        if cached:
+            print(f"[ANALYSIS] Loaded analysis from disk cache ({digest[:12]})")
+            _cache_put(project_id, cached)
+            return cached
+        
+        # Extract and analyze
+        try:
+            extract_path = os.path.join(temp_dir, "extracted")
+            print(f"[ANALYSIS] Extracting repository...")
+            await asyncio.to_thread(extract_zip, zip_path, extract_path)
+            
+            # Find the actual repository directory (it's usually wrapped)
+            repo_dir = extract_path
+            with os.scandir(extract_path) as entries:
+                subdirs = [e.name for e in entries if e.is_dir(follow_symlinks=False)]
+            print(f"[ANALYSIS] Found subdirectories: {subdirs}")
+            
+            if len(subdirs) == 1:
+                repo_dir = os.path.join(extract_path, subdirs[0])
+            
+            print(f"[ANALYSIS] Analyzing repository at: {repo_dir}")
+            
+            # Run analyzer in a worker process
+            metadata, chunks = await _analyze_in_pool(request, repo_dir)
+            search_engine = await asyncio.to_thread(SemanticSearchEngine, chunks)
+            
+            print(f"[ANALYSIS] Analysis complete: {metadata.repo_type}, {len(chunks)} chunks")
+            
+            # Cache the results
+            cached = (metadata, chunks, search_engine)
+            _cache_put(project_id, cached)
+            await asyncio.to_thread(save_analysis_cache, project_id, digest, cached)
+            return cached
+        
+        except Exception as analyze_err:
+            print(f"[ANALYSIS] Analysis error: {analyze_err}")
+            raise
 
 
 def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
     """Extract user_id from Bearer token."""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid token")
-    
-    token = authorization.split(" ")[1]
+    token = extract_bearer_token(authorization)
     token_data = verify_token(token)
     
     if not token_data:
@@ -29,7 +271,9 @@ def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
 @router.get("/{project_id}/metadata")
 async def get_repo_metadata(
     project_id: str,
-    authorization: Optional[str] = Header(None)
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
     """Get repository metadata and intelligence."""
     try:
@@ -43,153 +287,23 @@ async def get_repo_metadata(
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Return cached metadata if available
-        if project_id in _analysis_cache:
-            metadata, _, _ = _analysis_cache[project_id]
-            return {
-                "project_id": project_id,
-                "repo_type": metadata.repo_type,
-                "frameworks": metadata.frameworks,
-                "entry_points": metadata.entry_points,
-                "important_files": metadata.important_files,
-                "important_files_with_types": metadata.important_files_with_types or [],
-                "dependencies": metadata.dependencies,
-                "config_files": metadata.config_files,
-                "total_files": metadata.total_files,
-                "code_files": metadata.code_files,
-                "total_code_chunks": metadata.total_code_chunks,
-                "confidence_score": metadata.confidence_score
-            }
+        cached = _cache_get(project_id)
+        if cached:
+            metadata, _, _ = cached
+            return _conditional_response(
+                project_id, "metadata", if_none_match,
+                lambda: _metadata_payload(project_id, metadata)
+            )
         
         # Analyze the repository in real time
         try:
-            import tempfile
-            import zipfile
-            import httpx
-            import os
-            
-            repo_url = project.get("repository_url", "")
-            local_file_path = project.get("local_file_path")
-            
-            if not repo_url and not local_file_path:
-                raise ValueError("No repository URL or file provided")
-            
-            print(f"[ANALYSIS] Starting analysis for project {project_id}")
-            print(f"[ANALYSIS] Repository URL: {repo_url}")
-            print(f"[ANALYSIS] Local file path: {local_file_path}")
-            
-            # Download and extract the repository as ZIP
-            with tempfile.TemporaryDirectory() as temp_dir:
-                zip_path = None
-                
-                # Handle uploaded ZIP files (use local path directly)
-                if local_file_path:
-                    zip_path = local_file_path
-                    print(f"[ANALYSIS] Using uploaded ZIP: {zip_path}")
-                    if not os.path.exists(zip_path):
-                        raise ValueError(f"ZIP file not found: {zip_path}")
-                
-                # Handle file:// URLs (uploaded ZIPs)
-                elif repo_url.startswith("file://"):
-                    # Remove file:// prefix and handle Windows paths
-                    zip_path = repo_url[7:]  # Remove "file://" prefix
-                    # If path starts with single slash on Windows, it's actually a UNC path
-                    # Remove leading slash if it's Windows-style absolute path
-                    if zip_path.startswith("/") and len(zip_path) > 2 and zip_path[2] == ":":
-                        zip_path = zip_path[1:]
-                    print(f"[ANALYSIS] Using uploaded ZIP: {zip_path}")
-                    if not os.path.exists(zip_path):
-                        raise ValueError(f"ZIP file not found: {zip_path}")
-                
-                # Handle GitHub URLs
-                elif "github.com" in repo_url:
-                    # Extract owner/repo from URL
-                    parts = repo_url.rstrip('/').split('/')
-                    owner, repo = parts[-2], parts[-1]
-                    # Try main branch first, then master
-                    archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/main.zip"
-                    print(f"[ANALYSIS] Archive URL: {archive_url}")
-                    
-                    # Download the archive using synchronous client
-                    try:
-                        print(f"[ANALYSIS] Downloading repository...")
-                        response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                        print(f"[ANALYSIS] Download response status: {response.status_code}")
-                        
-                        if response.status_code == 404:
-                            # Try master branch instead
-                            archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/master.zip"
-                            print(f"[ANALYSIS] Trying master branch: {archive_url}")
-                            response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                            print(f"[ANALYSIS] Master branch response status: {response.status_code}")
-                        
-                        if response.status_code != 200:
-                            raise ValueError(f"Failed to download repository (HTTP {response.status_code})")
-                        
-                        zip_path = os.path.join(temp_dir, "repo.zip")
-                        with open(zip_path, 'wb') as f:
-                            f.write(response.content)
-                        print(f"[ANALYSIS] Repository downloaded ({len(response.content)} bytes)")
-                    
-                    except Exception as download_err:
-                        print(f"[ANALYSIS] Download error: {download_err}")
-                        raise
-                else:
-                    raise ValueError(f"Unsupported repository URL format: {repo_url}")
-                
-                # Extract and analyze
-                try:
-                    extract_path = os.path.join(temp_dir, "extracted")
-                    print(f"[ANALYSIS] Extracting repository...")
-                    with zipfile.ZipFile(zip_path, 'r') as zf:
-                        zf.extractall(extract_path)
-                    
-                    # Find the actual repository directory (it's usually wrapped)
-                    repo_dir = extract_path
-                    subdirs = [d for d in os.listdir(extract_path) if os.path.isdir(os.path.join(extract_path, d))]
-                    print(f"[ANALYSIS] Found subdirectories: {subdirs}")
-                    
-                    if len(subdirs) == 1:
-                        repo_dir = os.path.join(extract_path, subdirs[0])
-                    
-                    print(f"[ANALYSIS] Analyzing repository at: {repo_dir}")
-                    
-                    # Run analyzer (async, with progress callback for real-time responses)
-                    analyzer = RepositoryAnalyzer(repo_dir)
-
-                    async def simple_progress(stage, percent, message, file=None):
-                        print(f"[ANALYSIS][PROG] {percent}% {stage} - {message} {file or ''}")
-
-                    import asyncio
-                    metadata = await analyzer.analyze(progress_callback=simple_progress)
-                    chunks = analyzer.code_chunks  # Get chunks from analyzer
-                    search_engine = SemanticSearchEngine(chunks)
-                    
-                    print(f"[ANALYSIS] Analysis complete: {metadata.repo_type}, {len(chunks)} chunks")
-                    
-                    # Cache the results
-                    _analysis_cache[project_id] = (metadata, chunks, search_engine)
-                    
-                    return {
-                        "project_id": project_id,
-                        "repo_type": metadata.repo_type,
-                        "frameworks": metadata.frameworks,
-                        "entry_points": metadata.entry_points,
-                        "important_files": metadata.important_files,
-                        "important_files_with_types": metadata.important_files_with_types or [],
-                        "dependencies": metadata.dependencies,
-                        "config_files": metadata.config_files,
-                        "total_files": metadata.total_files,
-                        "code_files": metadata.code_files,
-                        "total_code_chunks": len(chunks),
-                        "confidence_score": metadata.confidence_score
-                    }
-                
-                except Exception as analyze_err:
-                    print(f"[ANALYSIS] Analysis error: {analyze_err}")
-                    raise
+            metadata, _, _ = await _load_or_analyze(project_id, project, request)
+            return _conditional_response(
+                project_id, "metadata", if_none_match,
+                lambda: _metadata_payload(project_id, metadata)
+            )
         
         except Exception as e:
-            import traceback
             print(f"[ANALYSIS] FAILED: {e}")
             print(traceback.format_exc())
             # Return error instead of falling back to demo data
@@ -219,7 +333,7 @@ async def get_analysis_progress(project_id: str, authorization: Optional[str] =
             "status": project.get("status"),
             "progress": project.get("progress", 0.0),
             "status_message": project.get("status_message", ""),
-            "activity_feed": project.get("activity_feed", [])[-200:]
+            "activity_feed": list(project.get("activity_feed", ()))[-ACTIVITY_FEED_MAXLEN:]
         }
     except HTTPException:
         raise
@@ -238,7 +352,7 @@ async def pause_analysis(project_id: str, authorization: Optional[str] = Header(
             raise HTTPException(status_code=403, detail="Access denied")
 
         project["paused"] = True
-        project.setdefault("activity_feed", []).append({"ts": __import__("datetime").datetime.utcnow().isoformat(), "level": "info", "message": "Analysis paused by user"})
+        project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append({"ts": datetime.utcnow().isoformat(), "level": "info", "message": "Analysis paused by user"})
         return {"project_id": project_id, "paused": True}
     except HTTPException:
         raise
@@ -257,7 +371,7 @@ async def resume_analysis(project_id: str, authorization: Optional[str] = Header
             raise HTTPException(status_code=403, detail="Access denied")
 
         project["paused"] = False
-        project.setdefault("activity_feed", []).append({"ts": __import__("datetime").datetime.utcnow().isoformat(), "level": "info", "message": "Analysis resumed by user"})
+        project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append({"ts": datetime.utcnow().isoformat(), "level": "info", "message": "Analysis resumed by user"})
         return {"project_id": project_id, "paused": False}
     except HTTPException:
         raise
@@ -269,6 +383,7 @@ async def resume_analysis(project_id: str, authorization: Optional[str] = Header
 async def ask_question(
     project_id: str,
     body: dict,
+    request: Request,
     authorization: Optional[str] = Header(None)
 ):
     """
@@ -288,7 +403,8 @@ async def ask_question(
             raise HTTPException(status_code=400, detail="Missing 'question'")
 
         # Ensure analysis has produced cache
-        if project_id not in _analysis_cache:
+        cached = await _completed_analysis(project_id, project, request)
+        if not cached:
             # Answer from current progress if available
             status = {
                 "status": project.get("status"),
@@ -297,7 +413,7 @@ async def ask_question(
             }
             raise HTTPException(status_code=202, detail=f"Analysis in progress. Current state: {status}")
 
-        metadata, chunks, search_engine = _analysis_cache[project_id]
+        metadata, chunks, search_engine = cached
         results = search_engine.search(question, limit=5)
 
         # Compose a concise answer with simple heuristic
@@ -316,14 +432,15 @@ async def ask_question(
         answer = " ".join(answer_lines)
         citations = [{"file_path": r["file_path"], "start_line": r["start_line"]} for r in results]
 
-        project.setdefault("qna", []).append({
-            "ts": __import__("datetime").datetime.utcnow().isoformat(),
+        now = datetime.utcnow().isoformat()
+        project.setdefault("qna", deque(maxlen=QNA_MAXLEN)).append({
+            "ts": now,
             "q": question,
             "a": answer,
             "citations": citations
         })
-        project.setdefault("activity_feed", []).append({
-            "ts": __import__("datetime").datetime.utcnow().isoformat(),
+        project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append({
+            "ts": now,
             "level": "info",
             "message": f"Answered question: {question}"
         })
@@ -362,14 +479,15 @@ async def add_context(
         if not instruction:
             raise HTTPException(status_code=400, detail="Missing 'instruction'")
 
+        now = datetime.utcnow().isoformat()
         ctx = {
-            "ts": __import__("datetime").datetime.utcnow().isoformat(),
+            "ts": now,
             "instruction": instruction,
             "priority": priority
         }
-        project.setdefault("user_context", []).append(ctx)
-        project.setdefault("activity_feed", []).append({
-            "ts": __import__("datetime").datetime.utcnow().isoformat(),
+        project.setdefault("user_context", deque(maxlen=USER_CONTEXT_MAXLEN)).append(ctx)
+        project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append({
+            "ts": now,
             "level": "info",
             "message": f"User context added (priority={priority}): {instruction}"
         })
@@ -380,31 +498,16 @@ async def add_context(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/{project_id}/diagrams")
-async def get_diagrams(project_id: str, authorization: Optional[str] = Header(None)):
-    """Return multiple Mermaid diagrams derived from analysis."""
-    try:
-        user_id = get_current_user_id(authorization)
-        project = await get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        if project["owner_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Access denied")
-        if project_id not in _analysis_cache:
-            raise HTTPException(status_code=202, detail="Analysis not yet complete")
-
-        metadata, chunks, _ = _analysis_cache[project_id]
-        total_files = metadata.total_files or 0
-        code_files = metadata.code_files or 0
-
-        architecture = f'''
+def _build_diagrams(metadata) -> Dict[str, str]:
+    """Build the Mermaid diagrams shown for an analyzed repository."""
+    architecture = f'''
 flowchart LR
     A[Users] -->|HTTP| B[Service]
     B --> C[Business Logic]
     C --> D[Data Layer]
     D --> E[(Storage)]
 '''
-        flow = f'''
+    flow = f'''
 flowchart TD
     start([Start]) --> detect{{Detect Frameworks}}
     detect -->|Yes| analyze[Analyze Important Files]
@@ -412,7 +515,7 @@ flowchart TD
     extract --> end([End])
     detect -->|No| end
 '''
-        sequence = f'''
+    sequence = f'''
 sequenceDiagram
     participant U as User
     participant API as API
@@ -422,7 +525,7 @@ sequenceDiagram
     S-->>API: Progress Updates
     API-->>U: Activity Feed + Progress
 '''
-        er = f'''
+    er = f'''
 erDiagram
     USER ||--o{{ PROJECT : owns
     PROJECT ||--o{{ CHUNK : contains
@@ -442,12 +545,38 @@ erDiagram
     }}
 '''
 
-        return {
-            "flowchart": architecture,
-            "flow": flow,
-            "sequence": sequence,
-            "er": er
-        }
+    return {
+        "flowchart": architecture,
+        "flow": flow,
+        "sequence": sequence,
+        "er": er
+    }
+
+
+@router.get("/{project_id}/diagrams")
+async def get_diagrams(
+    project_id: str,
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Return multiple Mermaid diagrams derived from analysis."""
+    try:
+        user_id = get_current_user_id(authorization)
+        project = await get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        if project["owner_id"] != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        cached = await _completed_analysis(project_id, project, request)
+        if not cached:
+            raise HTTPException(status_code=202, detail="Analysis not yet complete")
+
+        metadata, _, _ = cached
+        return _conditional_response(
+            project_id, "diagrams", if_none_match,
+            lambda: _build_diagrams(metadata)
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -455,7 +584,12 @@ erDiagram
 
 
 @router.get("/{project_id}/export")
-async def export_documentation(project_id: str, format: str = "md", authorization: Optional[str] = Header(None)):
+async def export_documentation(
+    project_id: str,
+    request: Request,
+    format: str = "md",
+    authorization: Optional[str] = Header(None)
+):
     """Export complete documentation (Markdown; PDF as placeholder)."""
     try:
         user_id = get_current_user_id(authorization)
@@ -464,16 +598,20 @@ async def export_documentation(project_id: str, format: str = "md", authorizatio
             raise HTTPException(status_code=404, detail="Project not found")
         if project["owner_id"] != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
-        if project_id not in _analysis_cache:
+        cached = await _completed_analysis(project_id, project, request)
+        if not cached:
             raise HTTPException(status_code=202, detail="Analysis not yet complete")
 
-        metadata, chunks, _ = _analysis_cache[project_id]
+        metadata, chunks, _ = cached
         from .agents.persona_analyzer import PersonaAnalyzer
         analyzer = PersonaAnalyzer(metadata, chunks)
-        sde = analyzer.analyze_for_sde()
-        pm = analyzer.analyze_for_pm()
-
-        diagrams = await get_diagrams(project_id, authorization=authorization)
+        # Both reports only read the cached metadata/chunks, so they can run
+        # side by side in worker threads.
+        sde, pm = await asyncio.gather(
+            asyncio.to_thread(analyzer.analyze_for_sde),
+            asyncio.to_thread(analyzer.analyze_for_pm)
+        )
+        diagrams = _build_diagrams(metadata)
 
         md = []
         md.append(f"# Project: {project.get('name','')}")
@@ -517,14 +655,71 @@ async def export_documentation(project_id: str, format: str = "md", authorizatio
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _chunk_id(chunk) -> str:
+    return f"{chunk.file_path}:{chunk.start_line}"
+
+
+def _chunks_payload(
+    project_id: str,
+    chunks,
+    limit: int,
+    chunk_type: Optional[str] = None,
+    include_content: bool = True
+) -> Dict[str, Any]:
+    selected = chunks
+    # Filter by chunk type if provided
+    if chunk_type:
+        selected = [c for c in selected if c.chunk_type == chunk_type]
+
+    # Convert chunks to dict format
+    chunk_list = []
+    for chunk in selected[:limit]:
+        item = {
+            "chunk_id": _chunk_id(chunk),
+            "file_path": chunk.file_path,
+            "chunk_type": chunk.chunk_type,
+            "name": chunk.name,
+            "start_line": chunk.start_line,
+            "end_line": chunk.end_line,
+            "language": chunk.language
+        }
+        if include_content:
+            item["content"] = chunk.content
+        else:
+            item["content_url"] = f"/analysis/{project_id}/chunks/{quote(item['chunk_id'], safe='/')}/content"
+        chunk_list.append(item)
+
+    return {
+        "project_id": project_id,
+        "total_chunks": len(selected),
+        "chunks": chunk_list
+    }
+
+
+def _empty_chunks_payload(project_id: str) -> Dict[str, Any]:
+    return {
+        "project_id": project_id,
+        "total_chunks": 0,
+        "chunks": [],
+        "message": "Analysis not yet complete"
+    }
+
+
 @router.get("/{project_id}/chunks")
 async def get_code_chunks(
     project_id: str,
+    request: Request,
     limit: int = 20,
     chunk_type: Optional[str] = None,
-    authorization: Optional[str] = Header(None)
+    fields: str = "all",
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Get code chunks from analyzed repository."""
+    """Get code chunks from analyzed repository.
+
+    fields=meta leaves out each chunk's content and gives its content_url
+    (/chunks/{chunk_id}/content) instead.
+    """
     try:
         user_id = get_current_user_id(authorization)
         project = await get_project(project_id)
@@ -535,41 +730,69 @@ async def get_code_chunks(
         if project["owner_id"] != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
+        if fields not in ("all", "meta"):
+            raise HTTPException(status_code=400, detail="fields must be 'all' or 'meta'")
+        
         # Get chunks from cache or return empty
-        if project_id in _analysis_cache:
-            _, chunks, _ = _analysis_cache[project_id]
-            
-            # Filter by chunk type if provided
-            if chunk_type:
-                chunks = [c for c in chunks if c.chunk_type == chunk_type]
-            
-            # Convert chunks to dict format
-            chunk_list = []
-            for chunk in chunks[:limit]:
-                chunk_list.append({
-                    "chunk_id": f"{chunk.file_path}:{chunk.start_line}",
-                    "file_path": chunk.file_path,
-                    "chunk_type": chunk.chunk_type,
-                    "name": chunk.name,
-                    "start_line": chunk.start_line,
-                    "end_line": chunk.end_line,
-                    "language": chunk.language,
-                    "content": chunk.content
-                })
-            
-            return {
-                "project_id": project_id,
-                "total_chunks": len(chunks),
-                "chunks": chunk_list
-            }
+        cached = await _completed_analysis(project_id, project, request)
+        if cached:
+            _, chunks, _ = cached
+            # Any larger limit gives the same response, and the same ETag key
+            limit = min(limit, len(chunks))
+
+            return _conditional_response(
+                project_id, f"chunks:{limit}:{chunk_type or ''}:{fields}", if_none_match,
+                lambda: _chunks_payload(project_id, chunks, limit, chunk_type, fields == "all")
+            )
         
         # Return empty if not cached yet
-        return {
-            "project_id": project_id,
-            "total_chunks": 0,
-            "chunks": [],
-            "message": "Analysis not yet complete"
-        }
+        return _empty_chunks_payload(project_id)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{project_id}/chunks/{chunk_id:path}/content")
+async def get_chunk_content(
+    project_id: str,
+    chunk_id: str,
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get the source of one code chunk (chunk_id as listed by /chunks)."""
+    try:
+        user_id = get_current_user_id(authorization)
+        project = await get_project(project_id)
+        
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        
+        if project["owner_id"] != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        cached = await _completed_analysis(project_id, project, request)
+        if not cached:
+            raise HTTPException(status_code=404, detail="Analysis not yet complete")
+        
+        index = _chunk_indexes.get(project_id)
+        if index is None:
+            index = _chunk_indexes[project_id] = {_chunk_id(c): c for c in cached[1]}
+        chunk = index.get(chunk_id)
+        if chunk is None:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+        
+        return _conditional_response(
+            project_id, f"chunk:{chunk_id}", if_none_match,
+            lambda: {
+                "project_id": project_id,
+                "chunk_id": chunk_id,
+                "language": chunk.language,
+                "content": chunk.content
+            }
+        )
     
     except HTTPException:
         raise
@@ -581,6 +804,7 @@ async def get_code_chunks(
 async def search_code(
     project_id: str,
     query: str,
+    request: Request,
     limit: int = 10,
     authorization: Optional[str] = Header(None)
 ):
@@ -596,8 +820,9 @@ async def search_code(
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Get search engine from cache
-        if project_id in _analysis_cache:
-            _, chunks, search_engine = _analysis_cache[project_id]
+        cached = await _completed_analysis(project_id, project, request)
+        if cached:
+            _, chunks, search_engine = cached
             
             # Perform semantic search
             results = search_engine.search(query, limit=limit)
@@ -666,6 +891,7 @@ async def trigger_analysis(
 async def get_persona_analysis(
     project_id: str,
     persona: str,
+    request: Request,
     authorization: Optional[str] = Header(None)
 ):
     """Get persona-specific analysis (SDE or PM).
@@ -696,90 +922,17 @@ async def get_persona_analysis(
         print(f"[PERSONA] Current cache keys: {list(_analysis_cache.keys())}")
         
         # Get cached analysis - if not found, trigger it
-        if project_id not in _analysis_cache:
+        cached = _cache_get(project_id)
+        if not cached:
             print(f"[PERSONA] Cache miss for {project_id}, attempting real-time analysis")
             
-            # Try to run analysis real-time
-            import tempfile
-            import zipfile
-            import httpx
-            import os
-            
-            repo_url = project.get("repository_url", "")
-            local_file_path = project.get("local_file_path")
-            
-            if not repo_url and not local_file_path:
+            if not project.get("repository_url") and not project.get("local_file_path"):
                 raise HTTPException(status_code=400, detail="No repository URL or file provided")
             
-            # Download and extract the repository as ZIP
-            with tempfile.TemporaryDirectory() as temp_dir:
-                zip_path = None
-                
-                # Handle uploaded ZIP files (use local path directly)
-                if local_file_path:
-                    zip_path = local_file_path
-                    if not os.path.exists(zip_path):
-                        raise ValueError(f"ZIP file not found: {zip_path}")
-                
-                # Handle GitHub URLs
-                elif "github.com" in repo_url:
-                    # Extract owner/repo from URL
-                    parts = repo_url.rstrip('/').split('/')
-                    owner, repo = parts[-2], parts[-1]
-                    archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/main.zip"
-                    
-                    try:
-                        response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                        
-                        if response.status_code == 404:
-                            archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/master.zip"
-                            response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                        
-                        if response.status_code != 200:
-                            raise ValueError(f"Failed to download repository (HTTP {response.status_code})")
-                        
-                        zip_path = os.path.join(temp_dir, "repo.zip")
-                        with open(zip_path, 'wb') as f:
-                            f.write(response.content)
-                    
-                    except Exception as download_err:
-                        print(f"[PERSONA] Download error: {download_err}")
-                        raise
-                else:
-                    raise ValueError(f"Unsupported repository URL format: {repo_url}")
-                
-                # Extract and analyze
-                try:
-                    extract_path = os.path.join(temp_dir, "extracted")
-                    with zipfile.ZipFile(zip_path, 'r') as zf:
-                        zf.extractall(extract_path)
-                    
-                    # Find the actual repository directory
-                    repo_dir = extract_path
-                    subdirs = [d for d in os.listdir(extract_path) if os.path.isdir(os.path.join(extract_path, d))]
-                    
-                    if len(subdirs) == 1:
-                        repo_dir = os.path.join(extract_path, subdirs[0])
-                    
-                    # Run analyzer
-                    from .agents.analyzer import RepositoryAnalyzer
-                    analyzer = RepositoryAnalyzer(repo_dir)
-                    metadata = await analyzer.analyze()
-                    chunks = analyzer.code_chunks
-                    search_engine = SemanticSearchEngine(chunks)
-                    
-                    print(f"[PERSONA] Real-time analysis complete, caching results")
-                    
-                    # Cache the results
-                    _analysis_cache[project_id] = (metadata, chunks, search_engine)
-                
-                except Exception as analyze_err:
-                    print(f"[PERSONA] Analysis error: {analyze_err}")
-                    import traceback
-                    print(traceback.format_exc())
-                    raise
-        
-        metadata, chunks, _ = _analysis_cache[project_id]
+            # Try to run analysis real-time
+            cached = await _load_or_analyze(project_id, project, request)
+        
+        metadata, chunks, _ = cached
         
         # Generate persona-specific analysis
         from .agents.persona_analyzer import PersonaAnalyzer
@@ -794,7 +947,98 @@ async def get_persona_analysis(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
         print(f"[PERSONA] Persona analysis error: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Persona analysis failed: {str(e)}")
+
+
+# Sections the dashboard bundle can include
+_DASHBOARD_SECTIONS = ("meta", "chunks", "sde", "pm")
+
+
+@router.get("/{project_id}/dashboard")
+async def get_dashboard_bundle(
+    project_id: str,
+    request: Request,
+    include: str = "meta,chunks,sde,pm",
+    chunk_limit: int = 15,
+    authorization: Optional[str] = Header(None)
+):
+    """Get several analysis views of a project in one response.
+
+    include is a comma-separated subset of meta, chunks, sde and pm. A
+    section that can't be produced yet is reported under "errors" (section
+    -> detail) instead of failing the whole request.
+    """
+    try:
+        user_id = get_current_user_id(authorization)
+        project = await get_project(project_id)
+        
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        
+        if project["owner_id"] != user_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        sections = [s.strip().lower() for s in include.split(",") if s.strip()]
+        unknown = set(sections).difference(_DASHBOARD_SECTIONS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sections: {', '.join(sorted(unknown))}; expected {', '.join(_DASHBOARD_SECTIONS)}"
+            )
+        
+        bundle: Dict[str, Any] = {"project_id": project_id}
+        errors: Dict[str, str] = {}
+        
+        # Persona analyses need a finished analysis, as in get_persona_analysis
+        personas = [s for s in sections if s in ("sde", "pm")]
+        if personas and project.get("status") != "completed":
+            for persona in personas:
+                errors[persona] = "Analysis not yet complete. Please wait."
+            personas = []
+        
+        # One analysis (cached or not) feeds every section
+        cached = _cache_get(project_id)
+        if not cached and ("meta" in sections or personas):
+            try:
+                cached = await _load_or_analyze(project_id, project, request)
+            except Exception as e:
+                print(f"[ANALYSIS] FAILED: {e}")
+                print(traceback.format_exc())
+                for section in ["meta"] * ("meta" in sections) + personas:
+                    errors[section] = f"Analysis failed: {str(e)}"
+                personas = []
+        
+        if cached:
+            metadata, chunks, _ = cached
+            if "meta" in sections:
+                bundle["meta"] = _metadata_payload(project_id, metadata)
+            if "chunks" in sections:
+                bundle["chunks"] = _chunks_payload(project_id, chunks, chunk_limit)
+            if personas:
+                from .agents.persona_analyzer import PersonaAnalyzer
+                analyzer = PersonaAnalyzer(metadata, chunks)
+                # Run side by side in worker threads, as in export_documentation;
+                # a failing persona is reported without dropping the others
+                results = await asyncio.gather(
+                    *(asyncio.to_thread(analyzer.analyze_for_sde if persona == "sde" else analyzer.analyze_for_pm)
+                      for persona in personas),
+                    return_exceptions=True
+                )
+                for persona, result in zip(personas, results):
+                    if isinstance(result, Exception):
+                        print(f"[PERSONA] Persona analysis error: {result}")
+                        errors[persona] = f"Persona analysis failed: {str(result)}"
+                    else:
+                        bundle[persona] = result
+        elif "chunks" in sections:
+            bundle["chunks"] = _empty_chunks_payload(project_id)
+        
+        bundle["errors"] = errors
+        return bundle
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
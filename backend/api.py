@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from .schemas import *
 from .auth import require_role
+from .utils.serialization import dumps
 
 router = APIRouter()
 
@@ -44,6 +46,17 @@ async def job_status(job_id: str, request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get('/jobs/{job_id}/events')
+async def job_events(job_id: str, request: Request):
+    """Stream a job's status and progress updates as server-sent events."""
+    orch = request.app.state.orchestrator
+
+    async def stream():
+        async for update in orch.events(job_id):
+            yield f"data: {dumps(update).decode()}\n\n"
+
+    return StreamingResponse(stream(), media_type='text/event-stream')
+
 @router.get('/docs/{job_id}/mermaid')
 async def get_mermaid(job_id: str, request: Request):
     """Get the Mermaid diagram for a completed job."""
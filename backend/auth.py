@@ -1,18 +1,81 @@
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt, JWTError
+from jose import jwk, JWTError
+from jose.exceptions import ExpiredSignatureError
+from jose.utils import base64url_decode
+import hashlib
+import json
 import os
+import threading
+import time
+from typing import Optional
 
 security = HTTPBearer()
 JWT_SECRET = os.getenv('JWT_SECRET', 'change-me')
+JWT_ALGORITHM = 'HS256'
+
+# HMAC key built once; jwt.decode would reconstruct it on every call
+_HMAC_KEY = jwk.construct(JWT_SECRET, JWT_ALGORITHM)
+
+# Decoded payloads of recently seen tokens: blake2b(token) -> (valid_until, payload).
+# Entries live at most TOKEN_CACHE_TTL seconds and never past the token's exp.
+# Shared by every verifier; the digest is personalised with the verifier's
+# scope so a token accepted under one key is never served to another.
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_SIZE = 8192
+_token_cache = {}
+# require_role's sync dependency runs in the threadpool; inserts and
+# evictions are serialized so concurrent evictions can't collide
+_token_cache_lock = threading.Lock()
+
+def cached_token_payload(token: str, scope: bytes, verify) -> dict:
+    """Return verify(token), reusing a cached result for the same scope."""
+    now = time.time()
+    key = hashlib.blake2b(token.encode(), digest_size=16, person=scope).digest()
+    hit = _token_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    payload = verify(token)
+    exp = payload.get('exp', now + TOKEN_CACHE_TTL)
+    if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+        raise JWTError('Invalid exp claim')
+    with _token_cache_lock:
+        _token_cache[key] = (min(exp, now + TOKEN_CACHE_TTL), payload)
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.pop(next(iter(_token_cache)))
+    return payload
+
+def _verify_hs256(token: str) -> dict:
+    """Check an HS256 token's signature and expiry with the prebuilt key."""
+    now = time.time()
+    signing_input, signature_segment = token.rsplit('.', 1)
+    header_segment, claims_segment = signing_input.split('.', 1)
+    header = json.loads(base64url_decode(header_segment.encode()))
+    if header.get('alg') != JWT_ALGORITHM:
+        raise JWTError('The specified alg value is not allowed')
+    if not _HMAC_KEY.verify(signing_input.encode(), base64url_decode(signature_segment.encode())):
+        raise JWTError('Signature verification failed.')
+    payload = json.loads(base64url_decode(claims_segment.encode()))
+    if not isinstance(payload, dict):
+        raise JWTError('Invalid payload')
+    if 'exp' in payload and int(payload['exp']) < int(now):
+        raise ExpiredSignatureError('Signature has expired.')
+    if 'nbf' in payload and int(payload['nbf']) > int(now):
+        raise JWTError('The token is not yet valid (nbf)')
+    return payload
 
 def decode_token(token: str):
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return payload
-    except JWTError:
+        return cached_token_payload(token, b'auth', _verify_hs256)
+    except (JWTError, ValueError, TypeError, KeyError):
         raise HTTPException(status_code=403, detail='Invalid token')
 
+def extract_bearer_token(authorization: Optional[str]) -> str:
+    """Return the token from an 'Authorization: Bearer <token>' header value."""
+    if not authorization or authorization[:7] != 'Bearer ' or len(authorization) < 8:
+        raise HTTPException(status_code=401, detail='Missing or invalid token')
+    return authorization[7:]
+
 def require_role(role: str):
     def dependency(credentials: HTTPAuthorizationCredentials = Security(security)):
         token = credentials.credentials
@@ -7,8 +7,9 @@ from .schemas import (
     UserInfo
 )
 from .services.user_service import (
-    signup, login, get_user_by_id, verify_token
+    signup, login, get_user_by_id, verify_token, UserExistsError
 )
+from .auth import extract_bearer_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -18,7 +19,9 @@ async def signup_handler(payload: SignupRequest):
     """Create a new user account."""
     try:
         user = await signup(payload.email, payload.password, payload.name)
-        return SignupResponse(**user)
+        return SignupResponse.model_validate(user)
+    except UserExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -30,7 +33,7 @@ async def login_handler(payload: LoginRequest):
     """Authenticate user and return access token."""
     try:
         result = await login(payload.email, payload.password)
-        return LoginResponse(**result)
+        return LoginResponse.model_validate(result)
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
@@ -40,10 +43,7 @@ async def login_handler(payload: LoginRequest):
 @router.get("/me", response_model=UserInfo)
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """Get current user info from token."""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid token")
-    
-    token = authorization.split(" ")[1]
+    token = extract_bearer_token(authorization)
     token_data = verify_token(token)
     
     if not token_data:
@@ -1,6 +1,9 @@
 import os
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from .api import router as api_router
 from .auth_routes import router as auth_router
 from .project_routes import router as project_router
@@ -8,8 +11,17 @@ from .analysis_routes import router as analysis_router
 from .admin_routes import router as admin_router
 from .workers.orchestrator import Orchestrator
 from .core import init_db
+from .utils.archive import shutdown_executor
+from .utils.responses import FastJSONResponse
+from .utils.http_client import close_http_client
+from .utils.llm_provider import close_llm_clients
+from .persistence import flush_pending_writes
 
-app = FastAPI(title='MultiAgent Code Analysis API')
+app = FastAPI(title='MultiAgent Code Analysis API', default_response_class=FastJSONResponse)
+# Analysis payloads (chunks, persona reports) are verbose JSON; compress
+# anything worth it for clients that accept gzip. Event streams are skipped
+# (Starlette >= 0.46, pinned in requirements.txt).
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv('GZIP_MIN_SIZE', 1024)))
 
 # Include routers
 app.include_router(auth_router)
@@ -21,6 +33,12 @@ app.include_router(api_router, prefix='/api')
 @app.on_event('startup')
 async def startup():
     await init_db()
+    # Process pool for CPU-bound repository analysis on request paths. Spawned
+    # (not forked) workers, since the app already runs writer/extraction threads.
+    app.state.cpu_pool = ProcessPoolExecutor(
+        max_workers=int(os.getenv('ANALYSIS_WORKERS', os.cpu_count() or 1)),
+        mp_context=multiprocessing.get_context('spawn')
+    )
     # create orchestrator instance and attach to app
     app.state.orchestrator = Orchestrator(app)
     await app.state.orchestrator.startup()
@@ -28,3 +46,8 @@ async def startup():
 @app.on_event('shutdown')
 async def shutdown():
     await app.state.orchestrator.shutdown()
+    app.state.cpu_pool.shutdown(wait=False, cancel_futures=True)
+    shutdown_executor()
+    await close_http_client()
+    close_llm_clients()
+    flush_pending_writes()
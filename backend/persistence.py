@@ -1,11 +1,28 @@
-"""Persistence layer for user data."""
-import json
+"""Persistence layer for user data.
+
+Users and projects are kept in one in-memory dict per store. Saves are
+handed to a background writer thread, which appends the changed records to
+a JSON-lines log (``users.log``, ``projects.log``); the log is folded back
+into the ``.json`` snapshot at startup once it outgrows the snapshot.
+"""
+import atexit
 import os
+import pickle
+import queue
+import threading
+import time
 from pathlib import Path
 
+# Bounded logs (activity feed, Q&A) are deques in memory; dumps stores them as lists
+from .utils.serialization import dumps as _dumps, loads as _loads
+
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 USERS_FILE = DATA_DIR / "users.json"
 PROJECTS_FILE = DATA_DIR / "projects.json"
+ANALYSIS_CACHE_DIR = DATA_DIR / "analysis_cache"
+
+# Number of pickled analysis results kept on disk (least recently used are pruned)
+MAX_ANALYSIS_CACHE_FILES = int(os.getenv("MAX_ANALYSIS_CACHE_FILES", 50))
 
 
 def ensure_data_dir():
@@ -13,49 +30,270 @@ def ensure_data_dir():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
+class JsonStore:
+    """A dict persisted as a JSON snapshot plus an append-only change log."""
+
+    def __init__(self, snapshot_path: Path, name: str):
+        self.snapshot_path = snapshot_path
+        self.log_path = snapshot_path.with_suffix(".log")
+        self.name = name
+        self._data = None
+        self._persisted = {}  # key -> serialized value last written
+        self._log = None
+        self._lock = threading.Lock()
+        # Keys saved since the last write; None means compare every key
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+
+    def load(self) -> dict:
+        """Return the store's dict, reading snapshot and log on first use."""
+        with self._lock:
+            if self._data is None:
+                ensure_data_dir()
+                self._data = self._read()
+                self._persisted = {k: _dumps(v) for k, v in self._data.items()}
+                self._maybe_compact()
+            return self._data
+
+    def save(self, db: dict, keys=None) -> None:
+        """Schedule the store to be written by the background writer.
+
+        With keys, only those entries are re-serialized and compared on the
+        next write (unless a full save is also pending).
+        """
+        if self._data is None:
+            self.load()
+        with self._dirty_lock:
+            # Callers normally pass the dict returned by load(); adopt any
+            # other. Only the small dirty lock is taken here: the writer holds
+            # _lock for the whole disk write.
+            if db is not self._data:
+                self._data = db
+            if keys is None:
+                self._dirty = None
+            elif self._dirty is not None:
+                self._dirty.update(keys)
+        _writer.submit(self)
+
+    def write_changes(self) -> None:
+        """Append a log record for every key added, changed or removed."""
+        with self._lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+                db = self._data
+            try:
+                self._write_records(db, dirty)
+            except Exception:
+                # Keep the keys pending so the next save retries them
+                with self._dirty_lock:
+                    if dirty is None or self._dirty is None:
+                        self._dirty = None
+                    else:
+                        self._dirty.update(dirty)
+                raise
+
+    def _write_records(self, db: dict, dirty) -> None:
+        if dirty is None:
+            candidates = list(db.items())
+            removed = [k for k in self._persisted if k not in db]
+        else:
+            candidates = [(k, db[k]) for k in dirty if k in db]
+            removed = [k for k in dirty if k not in db and k in self._persisted]
+        records = []
+        written = {}
+        for key, value in candidates:
+            blob = _dumps(value)
+            if self._persisted.get(key) != blob:
+                records.append(b'{"op":"put","k":' + _dumps(key) + b',"v":' + blob + b'}\n')
+                written[key] = blob
+        for key in removed:
+            records.append(_dumps({"op": "del", "k": key}) + b"\n")
+        if not records:
+            return
+        if self._log is None:
+            self._log = open(self.log_path, "ab", buffering=1 << 16)
+        self._log.write(b"".join(records))
+        self._log.flush()
+        # Only what reached the log counts as persisted
+        self._persisted.update(written)
+        for key in removed:
+            del self._persisted[key]
+
+    def compact(self) -> None:
+        """Rewrite the snapshot from memory and truncate the log."""
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"{" + b",".join(_dumps(k) + b":" + v for k, v in self._persisted.items()) + b"}")
+        os.replace(tmp_path, self.snapshot_path)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        open(self.log_path, "wb").close()
+
+    def _read(self) -> dict:
+        data = {}
+        if self.snapshot_path.exists():
+            try:
+                data = _loads(self.snapshot_path.read_bytes())
+            except Exception as e:
+                print(f"[PERSIST] Error loading {self.name}: {e}")
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = _loads(line)
+                    except Exception:
+                        # A torn final line from an interrupted write
+                        print(f"[PERSIST] Skipping corrupt {self.name} log record")
+                        continue
+                    if record.get("op") == "put":
+                        data[record["k"]] = record["v"]
+                    elif record.get("op") == "del":
+                        data.pop(record["k"], None)
+        return data
+
+    def _maybe_compact(self) -> None:
+        log_size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        snapshot_size = self.snapshot_path.stat().st_size if self.snapshot_path.exists() else 0
+        if log_size and log_size > 2 * snapshot_size:
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"[PERSIST] Error compacting {self.name}: {e}")
+
+
+class _StoreWriter(threading.Thread):
+    """Daemon thread that writes dirty stores off the request path.
+
+    Saves arriving within WRITE_DEBOUNCE seconds of each other are coalesced
+    into a single write per store.
+    """
+
+    WRITE_DEBOUNCE = 0.05
+
+    def __init__(self):
+        super().__init__(name="persist-writer", daemon=True)
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+
+    def submit(self, store: "JsonStore") -> None:
+        if self.ident is None:
+            with self._start_lock:
+                if self.ident is None:
+                    self.start()
+        self._queue.put_nowait(store)
+
+    def run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            time.sleep(self.WRITE_DEBOUNCE)
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stores = {item for item in pending if isinstance(item, JsonStore)}
+            for store in stores:
+                try:
+                    store.write_changes()
+                except Exception as e:
+                    print(f"[PERSIST] Error saving {store.name}: {e}")
+                    continue
+                # Long-running processes never reload, so compact here too
+                with store._lock:
+                    store._maybe_compact()
+            # Wake anyone waiting in flush() for these writes
+            for item in pending:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def flush(self, timeout: float = 10) -> None:
+        """Block until every save submitted so far has been written."""
+        if self.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout)
+
+
+_writer = _StoreWriter()
+
+
+def flush_pending_writes():
+    """Write out queued saves (called on application shutdown and at exit)."""
+    _writer.flush()
+
+
+atexit.register(flush_pending_writes)
+
+_users_store = JsonStore(USERS_FILE, "users")
+_projects_store = JsonStore(PROJECTS_FILE, "projects")
+
+
 def load_users_db():
-    """Load users from persistence."""
-    ensure_data_dir()
-    
-    if USERS_FILE.exists():
-        try:
-            with open(USERS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[PERSIST] Error loading users: {e}")
-            return {}
-    return {}
+    """Load users from persistence (the shared in-memory dict)."""
+    return _users_store.load()
 
 
 def save_users_db(users_db):
     """Save users to persistence."""
-    ensure_data_dir()
-    
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users_db, f, indent=2)
+        _users_store.save(users_db)
     except Exception as e:
         print(f"[PERSIST] Error saving users: {e}")
 
 
 def load_projects_db():
-    """Load projects from persistence."""
-    ensure_data_dir()
-    if PROJECTS_FILE.exists():
-        try:
-            with open(PROJECTS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[PERSIST] Error loading projects: {e}")
-            return {}
-    return {}
+    """Load projects from persistence (the shared in-memory dict)."""
+    return _projects_store.load()
 
 
-def save_projects_db(projects_db):
-    """Save projects to persistence."""
-    ensure_data_dir()
+def save_projects_db(projects_db, project_ids=None):
+    """Save projects to persistence (only project_ids, if given, are re-checked)."""
     try:
-        with open(PROJECTS_FILE, 'w') as f:
-            json.dump(projects_db, f, indent=2)
+        _projects_store.save(projects_db, project_ids)
     except Exception as e:
         print(f"[PERSIST] Error saving projects: {e}")
+
+
+def _analysis_cache_file(project_id, digest):
+    return ANALYSIS_CACHE_DIR / f"{project_id}_{digest}.pkl"
+
+
+def load_analysis_cache(project_id, digest):
+    """Load a pickled (metadata, chunks, search_engine) entry, or None on a miss."""
+    cache_file = _analysis_cache_file(project_id, digest)
+    if not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, 'rb') as f:
+            entry = pickle.load(f)
+        # Touch the file so pruning keeps recently used entries
+        os.utime(cache_file)
+        return entry
+    except Exception as e:
+        print(f"[PERSIST] Error loading analysis cache {cache_file.name}: {e}")
+        return None
+
+
+def save_analysis_cache(project_id, digest, entry):
+    """Pickle an analysis result keyed by project and archive content hash."""
+    try:
+        ANALYSIS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = _analysis_cache_file(project_id, digest)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(entry, f, protocol=5)
+        os.replace(tmp_file, cache_file)
+        _prune_analysis_cache()
+    except Exception as e:
+        print(f"[PERSIST] Error saving analysis cache: {e}")
+
+
+def _prune_analysis_cache():
+    """Delete the least recently used cache files past MAX_ANALYSIS_CACHE_FILES."""
+    files = sorted(ANALYSIS_CACHE_DIR.glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in files[MAX_ANALYSIS_CACHE_FILES:]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
@@ -1,24 +1,54 @@
 """Project management routes."""
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import deque
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Header, Request, UploadFile, File, Form
 from typing import Optional, List
 from .schemas import (
-    ProjectCreateRequest, ProjectCreateResponse, ProjectInfo
+    ProjectCreateRequest, ProjectCreateResponse, ProjectInfo, ProjectStatus
 )
 from .services.user_service import (
     create_project, get_project, get_user_projects,
-    verify_token
+    verify_token, ACTIVITY_FEED_MAXLEN
 )
+from .auth import extract_bearer_token
 from .utils.file_validator import validate_zip_file
+from .utils.responses import FastJSONResponse
+
+# Read size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# ProjectInfo fields and defaults. Stored projects are written by the service
+# layer, so read responses are projected and encoded directly instead of being
+# re-validated through the response model (which still documents the schema).
+_PROJECT_INFO_DEFAULTS = {
+    name: None if field.is_required() else field.default
+    for name, field in ProjectInfo.model_fields.items()
+}
+
+
+_PROJECT_STATUS_DEFAULTS = {
+    name: None if field.is_required() else field.default
+    for name, field in ProjectStatus.model_fields.items()
+}
+
+
+def _project_info(project: dict) -> dict:
+    return {name: project.get(name, default) for name, default in _PROJECT_INFO_DEFAULTS.items()}
+
+
+def _project_status(project: dict) -> dict:
+    return {name: project.get(name, default) for name, default in _PROJECT_STATUS_DEFAULTS.items()}
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
     """Extract user_id from Bearer token."""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid token")
-    
-    token = authorization.split(" ")[1]
+    token = extract_bearer_token(authorization)
     token_data = verify_token(token)
     
     if not token_data:
@@ -30,6 +60,7 @@ def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
 @router.post("/", response_model=ProjectCreateResponse)
 async def create_project_handler(
     payload: ProjectCreateRequest,
+    request: Request,
     authorization: Optional[str] = Header(None)
 ):
     """Create a new analysis project with GitHub URL."""
@@ -44,7 +75,8 @@ async def create_project_handler(
             name=payload.name,
             repository_url=payload.repository_url,
             personas=[p.value for p in payload.personas],
-            description=payload.description
+            description=payload.description,
+            cpu_pool=getattr(request.app.state, "cpu_pool", None)
         )
         
         return ProjectCreateResponse(
@@ -61,43 +93,51 @@ async def create_project_handler(
 
 @router.post("/upload")
 async def upload_project(
+    request: Request,
     file: UploadFile = File(...),
-    name: Optional[str] = Header(None),
-    personas: Optional[str] = Header("sde"),
+    name: Optional[str] = Form(None),
+    personas: Optional[List[str]] = Form(None),
+    name_header: Optional[str] = Header(None, alias="name"),
+    personas_header: Optional[str] = Header(None, alias="personas"),
     authorization: Optional[str] = Header(None)
 ):
-    """Upload a ZIP file for analysis."""
-    import tempfile
-    import os
-    import shutil
-    
+    """Upload a ZIP file for analysis.
+
+    name and personas are form fields; the older 'name' / comma-separated
+    'personas' headers are still accepted when the fields are absent.
+    """
     try:
         user_id = get_current_user_id(authorization)
         
+        name = name or name_header
         if not name:
-            raise ValueError("Project name is required (via 'name' header)")
-        
-        # Read file content
-        content = await file.read()
+            raise ValueError("Project name is required (via 'name' form field)")
         
         # Save uploaded file to a persistent location (not temp)
         upload_dir = os.path.join(os.getcwd(), "uploads")
         os.makedirs(upload_dir, exist_ok=True)
         
         # Generate unique filename
-        import uuid
         unique_name = f"{uuid.uuid4()}_{file.filename}"
         file_path = os.path.join(upload_dir, unique_name)
         
-        # Write file
+        # Stream the upload to disk in 1 MiB chunks, hashing as we go so the
+        # analysis cache can be keyed without re-reading the archive
+        hasher = hashlib.sha256()
+        size = 0
         with open(file_path, 'wb') as f:
-            f.write(content)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                hasher.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
         
         try:
             # Validate ZIP
             print(f"[UPLOAD] Validating ZIP file: {file_path}")
-            print(f"[UPLOAD] File size: {len(content)} bytes")
-            is_valid, error_msg = validate_zip_file(file_path, len(content))
+            print(f"[UPLOAD] File size: {size} bytes")
+            content_sha256 = hasher.hexdigest()
+            # testzip reads every member, so keep it off the event loop
+            is_valid, error_msg = await asyncio.to_thread(validate_zip_file, file_path, size, content_sha256)
             print(f"[UPLOAD] Validation result: is_valid={is_valid}, error={error_msg}")
             
             if not is_valid:
@@ -106,8 +146,10 @@ async def upload_project(
                     os.remove(file_path)
                 raise ValueError(error_msg)
             
-            # Parse personas from comma-separated header
-            persona_list = [p.strip() for p in personas.split(',')]
+            if personas:
+                persona_list = [p.strip() for p in personas]
+            else:
+                persona_list = [p.strip() for p in (personas_header or "sde").split(',')]
             
             # Create project with ZIP file path (pass as local_file_path, not URL)
             project = await create_project(
@@ -116,7 +158,9 @@ async def upload_project(
                 repository_url=f"Uploaded ZIP: {file.filename}",  # Show actual zip filename
                 personas=persona_list,
                 description=None,
-                local_file_path=file_path  # Pass actual file path here
+                local_file_path=file_path,  # Pass actual file path here
+                content_sha256=content_sha256,
+                cpu_pool=getattr(request.app.state, "cpu_pool", None)
             )
             
             return {
@@ -144,13 +188,35 @@ async def list_user_projects(authorization: Optional[str] = Header(None)):
     try:
         user_id = get_current_user_id(authorization)
         projects = await get_user_projects(user_id)
-        return [ProjectInfo(**p) for p in projects]
+        return FastJSONResponse([_project_info(p) for p in projects])
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {str(e)}")
 
 
+@router.get("/status", response_model=List[ProjectStatus])
+async def list_project_statuses(
+    ids: Optional[str] = None,
+    authorization: Optional[str] = Header(None)
+):
+    """Status fields only for the current user's projects (for polling).
+
+    ids optionally limits the result to a comma-separated list of project ids.
+    """
+    try:
+        user_id = get_current_user_id(authorization)
+        projects = await get_user_projects(user_id)
+        if ids:
+            wanted = set(ids.split(','))
+            projects = [p for p in projects if p["project_id"] in wanted]
+        return FastJSONResponse([_project_status(p) for p in projects])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch project statuses: {str(e)}")
+
+
 @router.get("/{project_id}", response_model=ProjectInfo)
 async def get_project_handler(
     project_id: str,
@@ -169,7 +235,7 @@ async def get_project_handler(
             # TODO: check if user is admin
             pass
         
-        return ProjectInfo(**project)
+        return FastJSONResponse(_project_info(project))
     except HTTPException:
         raise
     except Exception as e:
@@ -192,8 +258,9 @@ async def configure_project(project_id: str, config: dict, authorization: Option
 
         # Merge config
         project.setdefault("config", {}).update(config)
-        project["updated_at"] = __import__("datetime").datetime.utcnow().isoformat()
-        project.setdefault("activity_feed", []).append({"ts": __import__("datetime").datetime.utcnow().isoformat(), "level": "info", "message": f"Analysis configuration updated: {config}"})
+        now = datetime.utcnow().isoformat()
+        project["updated_at"] = now
+        project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append({"ts": now, "level": "info", "message": f"Analysis configuration updated: {config}"})
         return {"project_id": project_id, "config": project.get("config")}
     except HTTPException:
         raise
@@ -68,6 +68,13 @@ class ProjectInfo(BaseModel):
     job_id: Optional[str] = None
     error: Optional[str] = None
 
+class ProjectStatus(BaseModel):
+    project_id: str
+    status: str
+    progress: float = 0.0
+    status_message: Optional[str] = None
+    error: Optional[str] = None
+
 # ============ Analysis (Legacy) ============
 
 class AnalysisStartRequest(BaseModel):
@@ -1,30 +1,108 @@
 """User and authentication service."""
+import asyncio
+import hmac
+import os
+import random
+import tempfile
 import uuid
 import hashlib
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from ..auth import cached_token_payload
 from ..schemas import UserRole
-from ..persistence import load_users_db, save_users_db, load_projects_db, save_projects_db
+from ..utils.archive import extract_zip, file_sha256
+from ..utils.http_client import ARCHIVE_SPOOL_SIZE, download_github_archive, get_http_client
+from ..persistence import (
+    load_users_db, save_users_db, load_projects_db, save_projects_db, save_analysis_cache
+)
 
 # Load users from persistence on startup
 users_db = load_users_db()
 projects_db = load_projects_db()
 sessions_db = {}
 
-SECRET_KEY = "your-secret-key-change-in-production"  # TODO: move to env var
+# Signing secret for access tokens. JWT_SECRET is the variable .env.example and
+# docker-compose already set; the fallback is only for local development.
+_DEV_SECRET_KEY = "your-secret-key-change-in-production"
+SECRET_KEY = os.getenv("JWT_SECRET") or _DEV_SECRET_KEY
+if SECRET_KEY == _DEV_SECRET_KEY:
+    print("[AUTH] JWT_SECRET is not set; signing tokens with the development secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# HMAC key built once; passing the secret string would reconstruct it per call
+_SIGNING_KEY = jwk.construct(SECRET_KEY, ALGORITHM)
+_ALGORITHMS = (ALGORITHM,)
+
+# Background analyses in progress, keyed by repository URL or upload hash. A
+# project submitted for a repository that is already being analyzed waits on
+# the running analysis' future for its (digest, entry) instead of repeating it.
+_analysis_flights = {}
+
+# Only the tail of these per-project logs is ever served, so they are kept as
+# bounded deques instead of lists that grow for the lifetime of the project.
+ACTIVITY_FEED_MAXLEN = 200
+QNA_MAXLEN = 500
+USER_CONTEXT_MAXLEN = 100
+
+# Files preprocessed per activity-feed timestamp refresh
+FEED_TS_BATCH = 50
+
+# Secondary indexes over the stores above. They share the stored dicts. The
+# admin routes keep users_by_id in step when they add or remove users; project
+# lookups check an entry is still in its store. The stores and indexes are only mutated on
+# the event loop thread (worker threads/processes get copies of what they need
+# and results are applied back on the loop), so no lock guards them.
+users_by_id = {u["user_id"]: u for u in users_db.values()}
+projects_by_owner = {}
+for _project in projects_db.values():
+    projects_by_owner.setdefault(_project["owner_id"], {})[_project["project_id"]] = _project
+
+# Persisted as JSON lists; turn them back into bounded deques on load
+for _project in projects_db.values():
+    for _field, _maxlen in (
+        ("activity_feed", ACTIVITY_FEED_MAXLEN),
+        ("qna", QNA_MAXLEN),
+        ("user_context", USER_CONTEXT_MAXLEN),
+    ):
+        if isinstance(_project.get(_field), list):
+            _project[_field] = deque(_project[_field], maxlen=_maxlen)
+
+
+# scrypt work factors for stored password hashes (~50 ms and 16 MiB per hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
 
 def hash_password(password: str) -> str:
-    """Hash a password using SHA256 (for demo; use bcrypt in production)."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with salted scrypt, encoded as ``scrypt$n$r$p$salt$hash``."""
+    salt = os.urandom(16)
+    derived = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${derived.hex()}"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return hash_password(plain_password) == hashed_password
+    """Verify a password against its hash (scrypt, or a legacy unsalted SHA256)."""
+    if hashed_password.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, expected = hashed_password.split("$")
+            derived = hashlib.scrypt(
+                plain_password.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p)
+            )
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived.hex(), expected)
+    # Accounts created before scrypt hashing
+    return hmac.compare_digest(hashlib.sha256(plain_password.encode()).hexdigest(), hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True for legacy SHA256 hashes and scrypt hashes with outdated parameters."""
+    return not hashed_password.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
 
 
 def create_access_token(user_id: str, email: str, role: UserRole, expires_delta: Optional[timedelta] = None):
@@ -32,38 +110,45 @@ def create_access_token(user_id: str, email: str, role: UserRole, expires_delta:
     if expires_delta is None:
         expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    expire = datetime.utcnow() + expires_delta
     to_encode = {
         "sub": user_id,
         "email": email,
         "role": role.value,
-        "exp": expire
+        "exp": int(time.time() + expires_delta.total_seconds())
     }
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def _decode_access_token(token: str) -> dict:
+    return jwt.decode(token, _SIGNING_KEY, algorithms=_ALGORITHMS)
+
+
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        email = payload.get("email")
-        role = payload.get("role")
-        if user_id is None or email is None:
-            return None
-        return {"user_id": user_id, "email": email, "role": role}
+        payload = cached_token_payload(token, b'users', _decode_access_token)
     except JWTError:
         return None
+    user_id = payload.get("sub")
+    email = payload.get("email")
+    if user_id is None or email is None:
+        return None
+    return {"user_id": user_id, "email": email, "role": payload.get("role")}
+
+
+class UserExistsError(ValueError):
+    """Signup with an email that is already registered."""
 
 
 async def signup(email: str, password: str, name: str) -> dict:
     """Create a new user account."""
     if email in users_db:
-        raise ValueError("User already exists")
+        raise UserExistsError("User already exists")
     
-    user_id = str(uuid.uuid4())
-    hashed_pwd = hash_password(password)
+    user_id = uuid.uuid4().hex
+    # Deliberately slow; keep it off the event loop
+    hashed_pwd = await asyncio.to_thread(hash_password, password)
     
     users_db[email] = {
         "user_id": user_id,
@@ -74,6 +159,8 @@ async def signup(email: str, password: str, name: str) -> dict:
         "created_at": datetime.utcnow().isoformat()
     }
     
+    users_by_id[user_id] = users_db[email]
+    
     # Persist to disk
     save_users_db(users_db)
     print(f"[AUTH] User registered: {email}")
@@ -89,9 +176,15 @@ async def signup(email: str, password: str, name: str) -> dict:
 async def login(email: str, password: str) -> dict:
     """Authenticate a user and return a token."""
     user = users_db.get(email)
-    if not user or not verify_password(password, user["password"]):
+    if not user or not await asyncio.to_thread(verify_password, password, user["password"]):
         raise ValueError("Invalid credentials")
     
+    # Upgrade legacy/outdated hashes while the plain password is at hand
+    if password_needs_rehash(user["password"]):
+        user["password"] = await asyncio.to_thread(hash_password, password)
+        save_users_db(users_db)
+        print(f"[AUTH] Password hash upgraded: {email}")
+    
     token = create_access_token(
         user_id=user["user_id"],
         email=user["email"],
@@ -108,18 +201,18 @@ async def login(email: str, password: str) -> dict:
 
 async def get_user_by_id(user_id: str) -> Optional[dict]:
     """Fetch a user by user_id."""
-    for user in users_db.values():
-        if user["user_id"] == user_id:
-            return user
-    return None
+    return users_by_id.get(user_id)
 
 
 async def get_user_projects(user_id: str) -> list:
     """Get all projects owned by a user."""
-    return [p for p in projects_db.values() if p["owner_id"] == user_id]
+    owned = projects_by_owner.get(user_id, {})
+    for pid in [pid for pid, p in owned.items() if projects_db.get(pid) is not p]:
+        del owned[pid]  # deleted by an admin
+    return list(owned.values())
 
 
-async def create_project(user_id: str, name: str, repository_url: str, personas: list, description: str = None, local_file_path: str = None) -> dict:
+async def create_project(user_id: str, name: str, repository_url: str, personas: list, description: str = None, local_file_path: str = None, content_sha256: str = None, cpu_pool=None) -> dict:
     """Create a new project and trigger analysis.
     
     The project is created with status 'analyzing' and the analysis
@@ -127,16 +220,19 @@ async def create_project(user_id: str, name: str, repository_url: str, personas:
     
     Args:
         local_file_path: For ZIP uploads, the actual file path on disk
+        content_sha256: For ZIP uploads, SHA-256 of the archive computed while saving it
+        cpu_pool: Executor for the CPU-bound analysis step (the app's process pool)
     """
     from ..utils.file_validator import validate_github_url
     
     # Validate GitHub URL if provided (skip for uploaded ZIP files)
     if repository_url and not local_file_path:
-        is_valid, error_msg = validate_github_url(repository_url)
+        is_valid, error_msg = await validate_github_url(repository_url)
         if not is_valid:
             raise ValueError(f"Invalid repository: {error_msg}")
     
-    project_id = str(uuid.uuid4())
+    project_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
     
     projects_db[project_id] = {
         "project_id": project_id,
@@ -144,13 +240,14 @@ async def create_project(user_id: str, name: str, repository_url: str, personas:
         "name": name,
         "repository_url": repository_url,
         "local_file_path": local_file_path,  # Store actual file path for ZIPs
+        "content_sha256": content_sha256,
         "personas": personas,
         "description": description,
         "status": "analyzing",  # Start as analyzing
         "progress": 0.0,
         "status_message": "Initializing analysis...",
         # Activity feed: list of {ts, level, message, file}
-        "activity_feed": [],
+        "activity_feed": deque(maxlen=ACTIVITY_FEED_MAXLEN),
         # Pause/resume control
         "paused": False,
         # Analysis configuration (depth: quick/standard/deep, verbosity: low/med/high)
@@ -162,46 +259,104 @@ async def create_project(user_id: str, name: str, repository_url: str, personas:
                 "web_augment": True
             }
         },
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
+        "created_at": now,
+        "updated_at": now,
         "job_id": None,
         "error": None,
-        "user_context": [],
-        "qna": [],
+        "user_context": deque(maxlen=USER_CONTEXT_MAXLEN),
+        "qna": deque(maxlen=QNA_MAXLEN),
         "current_stage": None,
         "current_file": None
     }
     
+    projects_by_owner.setdefault(user_id, {})[project_id] = projects_db[project_id]
+    
     # Schedule analysis in the background
-    import asyncio
-    asyncio.create_task(_run_analysis_for_project(project_id, repository_url, personas, local_file_path))
+    asyncio.create_task(_run_analysis_for_project(project_id, repository_url, personas, local_file_path, cpu_pool))
     save_projects_db(projects_db)
     
     return projects_db[project_id]
 
 
-async def _run_analysis_for_project(project_id: str, repository_url: str, personas: list, local_file_path: str = None):
-    """Run analysis pipeline for a project (background task)."""
+# Extensions that are always binary; preprocessing skips them without a read
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf', '.psd',
+    '.zip', '.gz', '.tar', '.jar', '.so', '.dll', '.dylib', '.exe', '.class',
+    '.pyc', '.woff', '.woff2', '.ttf', '.otf', '.mp3', '.mp4', '.wav', '.bin',
+}
+
+
+def _is_binary_file(path: str) -> bool:
+    """Heuristic binary check: known extension, or a NUL byte in the first 1 KiB.
+
+    Uses a raw descriptor read rather than a buffered file object; raises
+    OSError if the file cannot be read.
+    """
+    if os.path.splitext(path)[1].lower() in BINARY_EXTENSIONS:
+        return True
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        head = os.read(fd, 1024)
+    finally:
+        os.close(fd)
+    return b'\0' in head
+
+
+def _sniff_files(paths: list) -> list:
+    """_is_binary_file for each path, with None where the file can't be read."""
+    results = []
+    for path in paths:
+        try:
+            results.append(_is_binary_file(path))
+        except OSError:
+            results.append(None)
+    return results
+
+
+# Files per worker-thread task when sniffing for binaries
+SNIFF_BATCH = 256
+
+# Directories never worth preprocessing; pruned from the walk entirely
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__'}
+
+
+def _iter_source_files(repo_dir: str):
+    """Yield file paths under repo_dir, not descending into SKIP_DIRS."""
+    for root, dirs, files in os.walk(repo_dir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for f in files:
+            yield os.path.join(root, f)
+
+
+def _retrieve_flight_error(flight) -> None:
+    """Mark a failed flight's exception as seen when nobody was waiting on it."""
+    if not flight.cancelled():
+        flight.exception()
+
+
+async def _run_analysis_for_project(project_id: str, repository_url: str, personas: list, local_file_path: str = None, cpu_pool=None):
+    """Run analysis pipeline for a project (background task).
+
+    Extraction, repository analysis and index building run off the event
+    loop: analysis in cpu_pool (the default executor if None), the rest in
+    worker threads. Project state is only mutated on the loop.
+    """
     try:
-        import asyncio
-        import httpx
-        import tempfile
-        import zipfile
-        import os
-        
         project = projects_db[project_id]
 
-        def feed(level: str, message: str, file: str = None):
+        def feed(level: str, message: str, file: str = None, ts: str = None):
             from ..utils.langfuse_client import track_event
+            now = ts or datetime.utcnow().isoformat()
             entry = {
-                "ts": datetime.utcnow().isoformat(),
+                "ts": now,
                 "level": level,  # info/warn/error
                 "message": message,
                 "file": file
             }
-            project.setdefault("activity_feed", []).append(entry)
-            project["updated_at"] = datetime.utcnow().isoformat()
-            save_projects_db(projects_db)
+            project.setdefault("activity_feed", deque(maxlen=ACTIVITY_FEED_MAXLEN)).append(entry)
+            project["updated_at"] = now
+            # Only this project changed; the writer skips re-serializing the rest
+            save_projects_db(projects_db, (project_id,))
             try:
                 track_event('analysis.activity', {
                     "project_id": project_id,
@@ -211,71 +366,75 @@ async def _run_analysis_for_project(project_id: str, repository_url: str, person
                 })
             except Exception:
                 pass
+
+        def set_phase(progress: float, message: str):
+            project.update({
+                "progress": progress,
+                "status_message": message,
+                "updated_at": datetime.utcnow().isoformat()
+            })
         
         # Phase 1: Download repository (20%)
-        project["progress"] = 5.0
-        project["status_message"] = "Downloading repository..."
-        project["updated_at"] = datetime.utcnow().isoformat()
+        set_phase(5.0, "Downloading repository...")
         feed("info", "Starting repository download and extraction")
+
+        flight_key = (local_file_path and project.get("content_sha256")) or repository_url
+        leader = _analysis_flights.get(flight_key)
+        flight = None
+        if leader is None:
+            flight = asyncio.get_running_loop().create_future()
+            flight.add_done_callback(_retrieve_flight_error)
+            _analysis_flights[flight_key] = flight
         
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
+            if leader is not None:
+                feed("info", "Repository is already being analyzed for another project, reusing that run")
+                digest, entry = await asyncio.shield(leader)
+                # Imported here: analysis_routes imports this module
+                from ..analysis_routes import _cache_put
+                _cache_put(project_id, entry)
+                await asyncio.to_thread(save_analysis_cache, project_id, digest, entry)
+                project["status"] = "completed"
+                set_phase(100.0, "Analysis complete!")
+                feed("info", "Analysis complete")
+                return
+
+            with tempfile.TemporaryDirectory() as temp_dir, \
+                    tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE, dir=temp_dir) as spool:
                 zip_path = None
+                digest = None
                 
                 # If this is a ZIP upload, use the local file
                 if local_file_path:
                     zip_path = local_file_path
-                    project["progress"] = 15.0
-                    project["status_message"] = "Extracting files..."
-                    project["updated_at"] = datetime.utcnow().isoformat()
+                    set_phase(15.0, "Extracting files...")
                 # Otherwise download from GitHub
                 elif "github.com" in repository_url:
-                    parts = repository_url.rstrip('/').split('/')
-                    owner, repo = parts[-2], parts[-1]
-                    archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/main.zip"
+                    # Download (streamed through the shared client, hashed on the way)
+                    _, digest = await download_github_archive(repository_url, spool)
+                    zip_path = spool
                     
-                    # Download
-                    response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                    if response.status_code == 404:
-                        archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/master.zip"
-                        response = httpx.get(archive_url, timeout=60, follow_redirects=True)
-                    
-                    if response.status_code != 200:
-                        raise ValueError(f"Failed to download (HTTP {response.status_code})")
-                    
-                    zip_path = os.path.join(temp_dir, "repo.zip")
-                    with open(zip_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    project["progress"] = 15.0
-                    project["status_message"] = "Extracting files..."
-                    project["updated_at"] = datetime.utcnow().isoformat()
+                    set_phase(15.0, "Extracting files...")
                 else:
                     raise ValueError(f"Unsupported repository URL format: {repository_url}")
                 
+                if digest is None:
+                    digest = (local_file_path and project.get("content_sha256")) or await asyncio.to_thread(file_sha256, zip_path)
                 extract_path = os.path.join(temp_dir, "extracted")
-                with zipfile.ZipFile(zip_path, 'r') as zf:
-                    zf.extractall(extract_path)
+                await asyncio.to_thread(extract_zip, zip_path, extract_path)
                 
                 # Find repo directory
                 repo_dir = extract_path
-                subdirs = [d for d in os.listdir(extract_path) if os.path.isdir(os.path.join(extract_path, d))]
+                with os.scandir(extract_path) as entries:
+                    subdirs = [e.name for e in entries if e.is_dir(follow_symlinks=False)]
                 if len(subdirs) == 1:
                     repo_dir = os.path.join(extract_path, subdirs[0])
                 
-                project["progress"] = 25.0
-                project["status_message"] = "Analyzing code structure..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(25.0, "Analyzing code structure...")
                 feed("info", "Repository extracted, starting preprocessing")
 
                 # Preprocessing: walk files and report per-file progress
-                all_files = []
-                for root, dirs, files in os.walk(repo_dir):
-                    # skip common skip dirs
-                    if any(skip in root for skip in ['.git', 'node_modules', '__pycache__']):
-                        continue
-                    for f in files:
-                        all_files.append(os.path.join(root, f))
+                all_files = list(_iter_source_files(repo_dir))
 
                 total_files = max(1, len(all_files))
                 processed = 0
@@ -287,51 +446,63 @@ async def _run_analysis_for_project(project_id: str, repository_url: str, person
                 elif depth == 'deep':
                     sample_rate = 1.0
 
-                for file_path in all_files:
+                # Quick mode samples up front so only kept files are sniffed.
+                # Seeded by project so re-running a project samples the same files.
+                if sample_rate < 1.0:
+                    rng = random.Random(hashlib.blake2b(project_id.encode(), digest_size=8).digest())
+                    keep = [rng.random() <= sample_rate for _ in all_files]
+                else:
+                    keep = [True] * len(all_files)
+                # Detect binary files (simple heuristic). The reads are file
+                # I/O, so batches of files are sniffed in parallel worker threads
+                to_sniff = [path for path, kept in zip(all_files, keep) if kept]
+                batches = await asyncio.gather(*(
+                    asyncio.to_thread(_sniff_files, to_sniff[i:i + SNIFF_BATCH])
+                    for i in range(0, len(to_sniff), SNIFF_BATCH)
+                ))
+                sniffed = iter([result for batch in batches for result in batch])
+
+                # Per-file feed entries share a timestamp refreshed every
+                # FEED_TS_BATCH files rather than formatting one per file
+                now_iso = None
+                for file_path, kept in zip(all_files, keep):
                     # Respect pause signal
                     while project.get("paused"):
                         await asyncio.sleep(0.5)
 
+                    if processed % FEED_TS_BATCH == 0:
+                        now_iso = datetime.utcnow().isoformat()
+                        # Yield so status polls are served during preprocessing
+                        await asyncio.sleep(0)
                     processed += 1
                     # If quick mode, skip some files
-                    import random
-                    if sample_rate < 1.0 and random.random() > sample_rate:
-                        feed("warn", "Skipped file due to quick mode", os.path.relpath(file_path, repo_dir))
+                    if not kept:
+                        feed("warn", "Skipped file due to quick mode", os.path.relpath(file_path, repo_dir), now_iso)
                         continue
 
-                    # Detect binary files (simple heuristic)
-                    try:
-                        with open(file_path, 'rb') as fh:
-                            start = fh.read(1024)
-                            if b'\0' in start:
-                                feed("warn", "Skipped binary file", os.path.relpath(file_path, repo_dir))
-                                continue
-                    except Exception:
-                        feed("warn", "Unable to read file during preprocessing", os.path.relpath(file_path, repo_dir))
+                    is_binary = next(sniffed)
+                    if is_binary is None:
+                        feed("warn", "Unable to read file during preprocessing", os.path.relpath(file_path, repo_dir), now_iso)
+                        continue
+                    if is_binary:
+                        feed("warn", "Skipped binary file", os.path.relpath(file_path, repo_dir), now_iso)
                         continue
 
                     pct = 25.0 + (processed / total_files) * 30.0  # map preprocessing to 25-55%
-                    project["progress"] = min(55.0, pct)
-                    project["status_message"] = f"Preprocessing files: {processed}/{total_files}"
-                    feed("info", f"Processing file {processed}/{total_files}: {os.path.basename(file_path)}", os.path.relpath(file_path, repo_dir))
-                    # small yield to allow UI to poll
-                    await asyncio.sleep(0.01)
+                    project.update({
+                        "progress": min(55.0, pct),
+                        "status_message": f"Preprocessing files: {processed}/{total_files}"
+                    })
+                    feed("info", f"Processing file {processed}/{total_files}: {os.path.basename(file_path)}", os.path.relpath(file_path, repo_dir), now_iso)
                 
                 # Phase 2: Detect languages and frameworks (40%)
-                from ..agents.analyzer import RepositoryAnalyzer
-                analyzer = RepositoryAnalyzer(repo_dir)
+                from ..agents.analyzer import analyze_directory
                 
-                project["progress"] = 35.0
-                project["status_message"] = "Detecting languages..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(35.0, "Detecting languages...")
                 feed("info", "Detecting languages and basic repository characteristics")
-                await asyncio.sleep(0.2)
 
-                project["progress"] = 45.0
-                project["status_message"] = "Detecting frameworks..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(45.0, "Detecting frameworks...")
                 feed("info", "Detecting frameworks and important files")
-                await asyncio.sleep(0.2)
                 # Web-augmented lookups (logs only)
                 try:
                     if project.get("config", {}).get("features", {}).get("web_augment", False):
@@ -342,32 +513,19 @@ async def _run_analysis_for_project(project_id: str, repository_url: str, person
                 except Exception:
                     pass
                 
-                # Phase 3: Extract code chunks (60%) - now using analyzer with progress callback
-                project["progress"] = 55.0
-                project["status_message"] = "Extracting code chunks..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                # Phase 3: Extract code chunks (60%) - analyzer runs in the CPU pool
+                set_phase(55.0, "Extracting code chunks...")
                 feed("info", "Extracting functions, classes and code chunks")
 
-                async def analyzer_progress(stage, percent, message, file=None):
-                    # Update project progress and feed
-                    project["progress"] = float(percent)
-                    project["status_message"] = message
-                    project["updated_at"] = datetime.utcnow().isoformat()
-                    if stage == 'processing_file' and file:
-                        feed('info', message, file)
-                    else:
-                        feed('info', message)
+                # Respect pause signal before handing the repository to the pool
+                while project.get("paused"):
+                    await asyncio.sleep(0.5)
 
-                    # Respect pause signal
-                    while project.get("paused"):
-                        await asyncio.sleep(0.5)
-
-                # Run analyzer asynchronously and pass progress callback
-                metadata = await analyzer.analyze(progress_callback=analyzer_progress)
+                loop = asyncio.get_running_loop()
+                metadata, chunks = await loop.run_in_executor(cpu_pool, analyze_directory, repo_dir)
 
                 # Web-augmented references (fetch short snippets based on detected frameworks)
                 try:
-                    import httpx
                     refs = {}
                     fw_lower = set([str(f).lower() for f in (getattr(metadata, "frameworks", []) or [])])
                     candidates = []
@@ -384,17 +542,17 @@ async def _run_analysis_for_project(project_id: str, repository_url: str, person
                     # Always include OWASP auth cheat sheet as general reference
                     candidates.append(("owasp-auth", "https://cheatsheetseries.owasp.org/cheatsheets/Authentication_Cheat_Sheet.html"))
 
-                    with httpx.Client(timeout=6.0, follow_redirects=True) as client:
-                        for key, url in candidates[:5]:
-                            try:
-                                r = client.get(url)
-                                if r.status_code == 200:
-                                    text = r.text
-                                    # Keep short snippet to avoid payload bloat
-                                    snippet = text[:800]
-                                    refs[url] = snippet
-                            except Exception:
-                                continue
+                    # Fetch the candidate pages concurrently on the shared client
+                    urls = [url for _, url in candidates[:5]]
+                    client = get_http_client()
+                    responses = await asyncio.gather(
+                        *(client.get(url, timeout=6.0) for url in urls), return_exceptions=True
+                    )
+                    for url, r in zip(urls, responses):
+                        if isinstance(r, Exception) or r.status_code != 200:
+                            continue
+                        # Keep short snippet to avoid payload bloat
+                        refs[url] = r.text[:800]
                     # Attach references to metadata object for downstream consumers
                     setattr(metadata, "web_references", refs or {})
                     if refs:
@@ -402,50 +560,54 @@ async def _run_analysis_for_project(project_id: str, repository_url: str, person
                 except Exception:
                     setattr(metadata, "web_references", {})
 
-                chunks = analyzer.code_chunks
                 feed("info", f"Extractor found {len(chunks)} code chunks")
                 
-                project["progress"] = 70.0
-                project["status_message"] = "Building search index..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(70.0, "Building search index...")
                 feed("info", "Building search index for fast lookup")
-                await asyncio.sleep(0.2)
                 
                 # Phase 4: Final processing (90%)
                 from ..agents.search import SemanticSearchEngine
-                search_engine = SemanticSearchEngine(chunks)
+                search_engine = await asyncio.to_thread(SemanticSearchEngine, chunks)
                 
-                project["progress"] = 85.0
-                project["status_message"] = "Caching results..."
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(85.0, "Caching results...")
                 feed("info", "Caching analysis results and finalizing")
                 
-                # Cache results
-                from ..analysis_routes import _analysis_cache
-                _analysis_cache[project_id] = (metadata, chunks, search_engine)
+                # Cache results (local import: analysis_routes imports this module)
+                from ..analysis_routes import _cache_put
+                _cache_put(project_id, (metadata, chunks, search_engine))
+                await asyncio.to_thread(save_analysis_cache, project_id, digest, (metadata, chunks, search_engine))
+                flight.set_result((digest, (metadata, chunks, search_engine)))
                 
                 # Phase 5: Complete (100%)
-                project["progress"] = 100.0
                 project["status"] = "completed"
-                project["status_message"] = "Analysis complete!"
-                project["updated_at"] = datetime.utcnow().isoformat()
+                set_phase(100.0, "Analysis complete!")
                 feed("info", "Analysis complete")
         
         except Exception as analyze_err:
-            project["progress"] = 100.0
-            project["status"] = "failed"
-            project["error"] = str(analyze_err)
-            project["status_message"] = f"Error: {str(analyze_err)}"
-            project["updated_at"] = datetime.utcnow().isoformat()
+            project.update({
+                "progress": 100.0,
+                "status": "failed",
+                "error": str(analyze_err),
+                "status_message": f"Error: {str(analyze_err)}",
+                "updated_at": datetime.utcnow().isoformat()
+            })
+        finally:
+            save_projects_db(projects_db)
+            if flight is not None:
+                _analysis_flights.pop(flight_key, None)
+                if not flight.done():
+                    flight.set_exception(RuntimeError(project.get("error") or "Analysis did not complete"))
     
     except Exception as e:
         project = projects_db.get(project_id)
         if project:
-            project["status"] = "failed"
-            project["error"] = str(e)
-            project["status_message"] = f"Critical error: {str(e)}"
-            project["progress"] = 0.0
-            project["updated_at"] = datetime.utcnow().isoformat()
+            project.update({
+                "status": "failed",
+                "error": str(e),
+                "status_message": f"Critical error: {str(e)}",
+                "progress": 0.0,
+                "updated_at": datetime.utcnow().isoformat()
+            })
 
 
 async def get_project(project_id: str) -> Optional[dict]:
@@ -458,6 +620,7 @@ async def update_project_status(project_id: str, status: str) -> dict:
     if project_id not in projects_db:
         raise ValueError("Project not found")
     
-    projects_db[project_id]["status"] = status
-    projects_db[project_id]["updated_at"] = datetime.utcnow().isoformat()
-    return projects_db[project_id]
+    project = projects_db[project_id]
+    project.update({"status": status, "updated_at": datetime.utcnow().isoformat()})
+    save_projects_db(projects_db, (project_id,))
+    return project
@@ -0,0 +1,169 @@
+"""ZIP archive extraction helpers."""
+import hashlib
+import os
+import queue
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from ..agents.analyzer import RepositoryAnalyzer
+
+# Copy buffer for extracted members: large enough that big checked-in files
+# are streamed in a few reads instead of zipfile's default 16 KiB chunks.
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Members are decompressed by a shared pool of threads (zlib releases the GIL),
+# each borrowing one of EXTRACT_WORKERS copy buffers for its batch.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", 8))
+
+# Archives with fewer analyzable files than this are extracted inline
+PARALLEL_EXTRACT_MIN_FILES = 64
+
+# Cap on the total uncompressed size extracted from one archive (zip bomb guard)
+MAX_EXTRACTED_SIZE = 500 * 1024 * 1024
+
+# Only members the analyzer reads are decompressed: the source files of its
+# languages, docs and the config/entry-point files it looks up by name. Other
+# members are created empty, so file and extension counts are unchanged.
+CODE_EXTENSIONS = {
+    ext for exts in RepositoryAnalyzer.LANGUAGE_PATTERNS.values() for ext in exts
+} | {
+    '.hpp', '.cs', '.kt', '.swift',
+    '.md', '.rst', '.toml', '.yaml', '.yml', '.json', '.cfg', '.ini',
+    '.xml', '.gradle', '.sql',
+}
+KNOWN_FILES = set(RepositoryAnalyzer.CONFIG_FILES) | {
+    name for names in RepositoryAnalyzer.IMPORTANT_FILES.values() for name in names
+} | {
+    'README', 'README.txt', 'LICENSE', 'Makefile', 'Procfile', 'go.sum', '.babelrc',
+}
+
+
+def file_sha256(path: str) -> str:
+    """Return the hex SHA-256 of a file, read in COPY_BUFFER_SIZE blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_analyzable(filename: str) -> bool:
+    """Return True if an archive member is worth extracting for analysis."""
+    basename = filename.rsplit('/', 1)[-1]
+    return basename in KNOWN_FILES or os.path.splitext(basename)[1].lower() in CODE_EXTENSIONS
+
+
+def _member_path(extract_path: str, filename: str) -> str:
+    """Map an archive member name to a path under extract_path.
+
+    Mirrors the sanitizing done by ZipFile.extractall: drive letters, empty,
+    '.' and '..' components are dropped so members cannot escape the target.
+    """
+    arcname = filename.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid = ('', os.path.curdir, os.path.pardir)
+    arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) if x not in invalid)
+    return os.path.join(extract_path, arcname)
+
+
+class BufferPool:
+    """Fixed set of reusable copy buffers handed out through a queue."""
+
+    def __init__(self, count: int, size: int):
+        self._buffers = queue.Queue()
+        for _ in range(count):
+            self._buffers.put(bytearray(size))
+
+    def acquire(self) -> bytearray:
+        return self._buffers.get()
+
+    def release(self, buf: bytearray) -> None:
+        self._buffers.put(buf)
+
+
+_buffer_pool = BufferPool(EXTRACT_WORKERS, COPY_BUFFER_SIZE)
+_executor: ThreadPoolExecutor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide extraction executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the extraction threads (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _copy_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, target: str, buf: bytearray) -> None:
+    view = memoryview(buf)
+    with zf.open(info) as src, open(target, 'wb') as dst:
+        while True:
+            n = src.readinto(view)
+            if not n:
+                break
+            dst.write(view[:n])
+
+
+def _extract_batch(zf: zipfile.ZipFile, members: list) -> None:
+    """Extract (info, target) pairs from an open archive using a pooled buffer."""
+    buf = _buffer_pool.acquire()
+    try:
+        for info, target in members:
+            _copy_member(zf, info, target, buf)
+    finally:
+        _buffer_pool.release(buf)
+
+
+def extract_zip(zip_path, extract_path: str) -> None:
+    """Extract the analyzable members of a ZIP archive.
+
+    Other members are created as empty files, so the analyzer's file and
+    extension counts match a full extraction without decompressing them.
+
+    zip_path is a path or a seekable binary file (e.g. a spooled download).
+
+    The archive is opened once: its central directory is parsed a single
+    time and the handle is shared by the extraction threads (ZipFile
+    serializes the underlying seeks/reads; inflation runs in parallel).
+    Members are selected up front, stopping once the total uncompressed
+    size would exceed MAX_EXTRACTED_SIZE, then copied in batches with
+    pooled 1 MiB buffers.
+    """
+    os.makedirs(extract_path, exist_ok=True)
+    extracted = 0
+    members = []
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for info in zf.infolist():
+            target = _member_path(extract_path, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if not _is_analyzable(info.filename):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                open(target, 'wb').close()
+                continue
+            extracted += info.file_size
+            if extracted > MAX_EXTRACTED_SIZE:
+                print(f"[ARCHIVE] Extraction size cap reached, skipping remaining files in {zip_path}")
+                break
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            members.append((info, target))
+
+        if len(members) < PARALLEL_EXTRACT_MIN_FILES:
+            _extract_batch(zf, members)
+            return
+
+        batches = [members[i::EXTRACT_WORKERS] for i in range(EXTRACT_WORKERS)]
+        executor = _get_executor()
+        futures = [executor.submit(_extract_batch, zf, batch) for batch in batches if batch]
+        for future in futures:
+            future.result()
@@ -1,27 +1,48 @@
 """File validation and repository utilities."""
+import os
 import re
+import time
 import httpx
-from typing import Tuple
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .http_client import get_http_client
 
 # File size limit: 100 MB
 MAX_FILE_SIZE = 100 * 1024 * 1024
 
+# CRC-check every member on upload (testzip). Off by default: extraction
+# verifies the CRC of each member it reads and fails the analysis on corruption.
+ZIP_DEEP_VALIDATE = os.getenv("ZIP_DEEP_VALIDATE", "").lower() in ("1", "true", "yes")
+
+# Accepted GitHub repository URL forms
+_GITHUB_HTTPS_RE = re.compile(r'^https://github\.com/[a-zA-Z0-9_-]+/[a-zA-Z0-9_.-]+/?$')
+_GITHUB_SSH_RE = re.compile(r'^git@github\.com:[a-zA-Z0-9_-]+/[a-zA-Z0-9_.-]+\.git$')
+
+# GitHub accessibility checks keyed by normalized API URL:
+# api_url -> (valid_until, (is_valid, error)). Failures expire sooner so a
+# repository that is made public or restored is picked up quickly. Timeouts
+# and network errors are not cached.
+_URL_VALIDATION_CACHE_SIZE = 1024
+_URL_VALIDATION_TTL = 300
+_URL_VALIDATION_NEGATIVE_TTL = 30
+_url_validation_cache: "OrderedDict[str, Tuple[float, Tuple[bool, str]]]" = OrderedDict()
+
+# Results of ZIP content checks keyed by (sha256, size); the same bytes always
+# validate the same way, so re-uploads skip the CRC scan.
+_ZIP_VALIDATION_CACHE_SIZE = 512
+_zip_validation_cache: "OrderedDict[Tuple[str, int], Tuple[bool, str]]" = OrderedDict()
+
 
-def validate_github_url(url: str) -> Tuple[bool, str]:
+async def validate_github_url(url: str) -> Tuple[bool, str]:
     """Validate a GitHub URL format and check if repository is accessible.
     
     Returns: (is_valid, error_message or '')
     """
-    # GitHub URL patterns
-    github_patterns = [
-        r'^https://github\.com/[a-zA-Z0-9_-]+/[a-zA-Z0-9_.-]+/?$',
-        r'^git@github\.com:[a-zA-Z0-9_-]+/[a-zA-Z0-9_.-]+\.git$',
-    ]
-    
     url = url.strip()
     
     # Check format
-    is_valid_format = any(re.match(pattern, url) for pattern in github_patterns)
+    is_valid_format = _GITHUB_HTTPS_RE.match(url) or _GITHUB_SSH_RE.match(url)
     if not is_valid_format:
         return False, "Invalid GitHub URL format. Use: https://github.com/owner/repo"
     
@@ -37,16 +58,28 @@ def validate_github_url(url: str) -> Tuple[bool, str]:
         # Check if repo exists by accessing the API
         api_url = url.replace('https://github.com/', 'https://api.github.com/repos/')
         
-        resp = httpx.head(api_url, timeout=5, follow_redirects=True)
+        now = time.time()
+        hit = _url_validation_cache.get(api_url)
+        if hit and hit[0] > now:
+            return hit[1]
+        
+        resp = await get_http_client().head(api_url, timeout=5)
         
         if resp.status_code == 404:
-            return False, "GitHub repository not found (may be private or deleted)"
+            result = (False, "GitHub repository not found (may be private or deleted)")
         elif resp.status_code == 401:
-            return False, "GitHub repository is private (requires authentication)"
+            result = (False, "GitHub repository is private (requires authentication)")
         elif resp.status_code >= 400:
-            return False, f"Unable to access repository (HTTP {resp.status_code})"
+            result = (False, f"Unable to access repository (HTTP {resp.status_code})")
+        else:
+            result = (True, "")
         
-        return True, ""
+        ttl = _URL_VALIDATION_TTL if result[0] else _URL_VALIDATION_NEGATIVE_TTL
+        _url_validation_cache[api_url] = (now + ttl, result)
+        _url_validation_cache.move_to_end(api_url)
+        if len(_url_validation_cache) > _URL_VALIDATION_CACHE_SIZE:
+            _url_validation_cache.popitem(last=False)
+        return result
     
     except httpx.TimeoutException:
         return False, "Timeout connecting to GitHub (check your internet connection)"
@@ -56,13 +89,14 @@ def validate_github_url(url: str) -> Tuple[bool, str]:
         return False, f"Validation error: {str(e)}"
 
 
-def validate_zip_file(file_path: str, file_size: int) -> Tuple[bool, str]:
+def validate_zip_file(file_path: str, file_size: int, content_sha256: Optional[str] = None) -> Tuple[bool, str]:
     """Validate a ZIP file.
     
+    When content_sha256 is given, the archive check is memoized by
+    (content_sha256, file_size).
+    
     Returns: (is_valid, error_message or '')
     """
-    import zipfile
-    
     # Check file size
     if file_size > MAX_FILE_SIZE:
         return False, f"File too large. Maximum size: 100MB, received: {file_size / (1024*1024):.1f}MB"
@@ -71,13 +105,36 @@ def validate_zip_file(file_path: str, file_size: int) -> Tuple[bool, str]:
     if not file_path.lower().endswith('.zip'):
         return False, "Invalid file format. Only .zip files are supported"
     
+    if content_sha256 is None:
+        return _check_zip_contents(file_path)
+    
+    key = (content_sha256, file_size)
+    result = _zip_validation_cache.get(key)
+    if result is not None:
+        _zip_validation_cache.move_to_end(key)
+        return result
+    result = _check_zip_contents(file_path)
+    _zip_validation_cache[key] = result
+    if len(_zip_validation_cache) > _ZIP_VALIDATION_CACHE_SIZE:
+        _zip_validation_cache.popitem(last=False)
+    return result
+
+
+def _check_zip_contents(file_path: str) -> Tuple[bool, str]:
+    """Open the archive and verify it is readable and non-empty.
+
+    Only the central directory is parsed unless ZIP_DEEP_VALIDATE is set.
+    """
+    import zipfile
+    
     try:
         # Try to open and validate ZIP - just check it's valid
         with zipfile.ZipFile(file_path, 'r') as zf:
             # Check if ZIP is corrupted
-            bad_file = zf.testzip()
-            if bad_file:
-                return False, f"ZIP file is corrupted. Bad file: {bad_file}"
+            if ZIP_DEEP_VALIDATE:
+                bad_file = zf.testzip()
+                if bad_file:
+                    return False, f"ZIP file is corrupted. Bad file: {bad_file}"
             
             # Check if ZIP is empty
             files = zf.namelist()
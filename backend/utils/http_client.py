@@ -0,0 +1,84 @@
+"""Shared async HTTP client and repository archive downloads."""
+import asyncio
+import hashlib
+from typing import BinaryIO, Optional, Tuple, Union
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - enables httpx's HTTP/2 support (httpx[http2])
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# Read size when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Downloaded archives up to this size stay in memory (SpooledTemporaryFile);
+# larger ones spill to a temp file once instead of a write-then-reread repo.zip
+ARCHIVE_SPOOL_SIZE = 64 * 1024 * 1024
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use.
+
+    Reusing one client keeps TCP/TLS connections to GitHub alive between
+    downloads instead of paying a handshake per request. HTTP/2 is used when
+    the h2 package is installed, multiplexing concurrent fetches per host.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=60,
+            follow_redirects=True,
+            http2=_HTTP2,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def download_github_archive(repo_url: str, dest: Union[str, BinaryIO]) -> Tuple[int, str]:
+    """Stream a GitHub repository's ZIP archive to dest.
+
+    dest is a path or a writable, seekable binary file (rewound when done so it
+    can be handed straight to zipfile). Tries the main branch first, then
+    master. The body is read and written in DOWNLOAD_CHUNK_SIZE pieces.
+    Returns (bytes written, sha256 hex).
+    """
+    parts = repo_url.rstrip('/').split('/')
+    owner, repo = parts[-2], parts[-1]
+    client = get_http_client()
+    for branch in ("main", "master"):
+        archive_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/{branch}.zip"
+        print(f"[DOWNLOAD] Archive URL: {archive_url}")
+        async with client.stream("GET", archive_url) as response:
+            if response.status_code == 404 and branch == "main":
+                continue
+            if response.status_code != 200:
+                raise ValueError(f"Failed to download repository (HTTP {response.status_code})")
+            hasher = hashlib.sha256()
+            size = 0
+            f = open(dest, 'wb') if isinstance(dest, str) else dest
+            try:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    hasher.update(chunk)
+                    # Disk writes go to a worker thread, as for uploads
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                if f is not dest:
+                    f.close()
+            if f is dest:
+                dest.seek(0)
+            print(f"[DOWNLOAD] Repository downloaded ({size} bytes)")
+            return size, hasher.hexdigest()
@@ -1,7 +1,79 @@
+import atexit
 import os
+import queue
+import sys
+import threading
+import time
+
+from .serialization import dumps
+
 # Placeholder for langfuse integration
 LANGFUSE_KEY = os.getenv('LANGFUSE_API_KEY')
 
+# Events are queued and written out in batches by a background thread, so
+# callers (including the per-file analysis loop) never wait on stdout.
+# Events arriving while the queue is full are dropped and counted.
+EVENT_QUEUE_SIZE = 10000
+EVENT_BATCH_SIZE = 100
+
+_events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+_dropped = 0
+_drainer = None
+_start_lock = threading.Lock()
+
+
 def track_event(name, payload):
-    # In production: call Langfuse SDK or API to log events/traces
-    print(f'[langfuse] event={name} payload={payload}')
+    """Queue an event for the background writer."""
+    global _dropped
+    if _drainer is None:
+        _start_drainer()
+    try:
+        _events.put_nowait((name, payload))
+    except queue.Full:
+        _dropped += 1
+
+
+def _start_drainer():
+    global _drainer
+    with _start_lock:
+        if _drainer is None:
+            _drainer = threading.Thread(target=_drain, name="event-writer", daemon=True)
+            _drainer.start()
+
+
+def _drain():
+    while True:
+        batch = [_events.get()]
+        while len(batch) < EVENT_BATCH_SIZE:
+            try:
+                batch.append(_events.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(batch)
+        except Exception:
+            pass
+        finally:
+            for _ in batch:
+                _events.task_done()
+
+
+def _write_batch(batch):
+    # In production: send the batch to the Langfuse API in one request
+    global _dropped
+    lines = [f'[langfuse] event={name} payload={dumps(payload, default=str).decode()}\n' for name, payload in batch]
+    if _dropped:
+        lines.append(f'[langfuse] dropped {_dropped} events (queue full)\n')
+        _dropped = 0
+    sys.stdout.write(''.join(lines))
+    sys.stdout.flush()
+
+
+def flush_events(timeout: float = 5):
+    """Wait (up to timeout seconds) for queued events to be written."""
+    deadline = time.monotonic() + timeout
+    while _drainer is not None and _events.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+atexit.register(flush_events)
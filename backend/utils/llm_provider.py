@@ -1,6 +1,8 @@
+import hashlib
 import os
 import openai
 import httpx
+from collections import OrderedDict
 from .langfuse_client import track_event
 import time
 
@@ -15,6 +17,38 @@ openai.api_key = OPENAI_KEY
 DEFAULT_LLM_MODEL = os.getenv('DEFAULT_LLM_MODEL', 'claude-haiku-4.5')
 
 
+# HTTP client for the Anthropic endpoint, shared across calls so connections
+# (and their TLS sessions) are reused; created on first use.
+_anthropic_client: httpx.Client | None = None
+
+
+def _get_anthropic_client() -> httpx.Client:
+    global _anthropic_client
+    if _anthropic_client is None or _anthropic_client.is_closed:
+        _anthropic_client = httpx.Client(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=50),
+        )
+    return _anthropic_client
+
+
+def close_llm_clients() -> None:
+    """Close the shared LLM HTTP client (called on application shutdown)."""
+    global _anthropic_client
+    if _anthropic_client is not None:
+        _anthropic_client.close()
+        _anthropic_client = None
+
+
+# Completions for identical (model, max_tokens, prompt) requests, reused for
+# LLM_CACHE_TTL seconds. Calls run at temperature 0, so a repeat request would
+# return the same text. Opt in with LLM_CACHE_ENABLE=1.
+LLM_CACHE_ENABLE = os.getenv('LLM_CACHE_ENABLE', '').lower() in ('1', 'true', 'yes')
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 10000))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 86400))
+_llm_cache: "OrderedDict[bytes, tuple[float, str]]" = OrderedDict()
+
+
 def get_default_model() -> str:
     """Return the configured default LLM model name."""
     return DEFAULT_LLM_MODEL
@@ -23,6 +57,35 @@ def get_default_model() -> str:
 def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> str:
     """Call the configured model and return a text completion.
 
+    With LLM_CACHE_ENABLE set, repeated identical requests are answered from
+    an in-memory cache.
+    """
+    use_model = model or get_default_model()
+    if not LLM_CACHE_ENABLE:
+        return _call_llm_uncached(prompt, use_model, max_tokens)
+
+    key = hashlib.sha256(f"{use_model}|{max_tokens}|{prompt}".encode()).digest()
+    now = time.time()
+    hit = _llm_cache.get(key)
+    if hit and hit[0] > now:
+        _llm_cache.move_to_end(key)
+        try:
+            track_event('llm.call', {'model': use_model, 'prompt_len': len(prompt), 'cache_hit': True})
+        except Exception:
+            pass
+        return hit[1]
+
+    out = _call_llm_uncached(prompt, use_model, max_tokens)
+    _llm_cache[key] = (now + LLM_CACHE_TTL, out)
+    _llm_cache.move_to_end(key)
+    if len(_llm_cache) > LLM_CACHE_SIZE:
+        _llm_cache.popitem(last=False)
+    return out
+
+
+def _call_llm_uncached(prompt: str, use_model: str, max_tokens: int) -> str:
+    """Send one completion request to the provider for use_model.
+
     Behavior:
     - If the `model` name contains 'claude', attempt to call Anthropic's HTTP API using
       the `CLAUDE_API_KEY` environment variable.
@@ -31,7 +94,6 @@ def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> st
     Note: This is a small router convenience for the demo environment. In production,
     you may want a more robust client, retries, timeouts, streaming, and proper error handling.
     """
-    use_model = model or get_default_model()
 
     if 'claude' in use_model.lower():
         if not CLAUDE_KEY:
@@ -51,10 +113,9 @@ def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> st
         }
 
         start = time.time()
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.post(url, json=data, headers=headers)
-            resp.raise_for_status()
-            j = resp.json()
+        resp = _get_anthropic_client().post(url, json=data, headers=headers)
+        resp.raise_for_status()
+        j = resp.json()
 
         # Anthropic responses historically put the text in 'completion', but APIs vary.
         out = j.get('completion') or j.get('output') or j.get('text') or ''
@@ -64,7 +125,8 @@ def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> st
                 'model': use_model,
                 'prompt_len': len(prompt),
                 'max_tokens': max_tokens,
-                'duration_ms': int((time.time() - start) * 1000)
+                'duration_ms': int((time.time() - start) * 1000),
+                'cache_hit': False
             })
         except Exception:
             pass
@@ -91,7 +153,8 @@ def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> st
                 'model': use_model,
                 'prompt_len': len(prompt),
                 'max_tokens': max_tokens,
-                'duration_ms': int((time.time() - start) * 1000)
+                'duration_ms': int((time.time() - start) * 1000),
+                'cache_hit': False
             })
         except Exception:
             pass
@@ -112,22 +175,66 @@ def call_llm(prompt: str, model: str | None = None, max_tokens: int = 512) -> st
                 'model': use_model,
                 'prompt_len': len(prompt),
                 'max_tokens': max_tokens,
-                'duration_ms': int((time.time() - start) * 1000)
+                'duration_ms': int((time.time() - start) * 1000),
+                'cache_hit': False
             })
         except Exception:
             pass
         return out
 
 
-def embed_text(text: str) -> list[float]:
-    """Placeholder embedding function.
+# Texts per embedding request (typical provider limit per call)
+EMBED_BATCH_SIZE = 96
+EMBED_DIMENSIONS = 1536
+# OpenAI embedding model; its output size must match EMBED_DIMENSIONS
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+
 
-    In production plug in your preferred embedding provider. Left as a small wrapper
-    so the rest of the codebase can continue calling `embed_text(...)`.
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed many texts, issuing one provider request per EMBED_BATCH_SIZE texts.
+
+    Prefer this over calling `embed_text` in a loop: per-request overhead is
+    paid once per batch instead of once per text.
     """
-    # For now return a fixed-length zero-vector to preserve API shape.
+    vectors: list[list[float]] = []
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(_embed_batch(texts[i:i + EMBED_BATCH_SIZE]))
+    return vectors
+
+
+def _embed_batch(batch: list[str]) -> list[list[float]]:
+    """Embed one batch with a single OpenAI embeddings request.
+
+    Without `OPENAI_API_KEY`, return fixed-length zero-vectors so the API
+    shape is preserved in keyless (demo) environments.
+    """
+    if not OPENAI_KEY:
+        try:
+            track_event('llm.embed', {'batch_size': len(batch), 'text_len': sum(len(t) for t in batch)})
+        except Exception:
+            pass
+        return [[0.0] * EMBED_DIMENSIONS for _ in batch]
+
+    start = time.time()
+    resp = openai.embeddings.create(model=EMBEDDING_MODEL, input=batch)
+    vectors = [item.embedding for item in sorted(resp.data, key=lambda item: item.index)]
     try:
-        track_event('llm.embed', {'text_len': len(text)})
+        track_event('llm.embed', {
+            'provider': 'openai',
+            'model': EMBEDDING_MODEL,
+            'batch_size': len(batch),
+            'text_len': sum(len(t) for t in batch),
+            'duration_ms': int((time.time() - start) * 1000)
+        })
     except Exception:
         pass
-    return [0.0] * 1536
+    return vectors
+
+
+def embed_text(text: str) -> list[float]:
+    """Embed a single text (thin wrapper over `embed_texts`).
+
+    Left as a small wrapper so the rest of the codebase can continue calling
+    `embed_text(...)`.
+    """
+    return embed_texts([text])[0]
@@ -0,0 +1,12 @@
+"""JSON response class backed by orjson."""
+from typing import Any
+from fastapi.responses import JSONResponse
+
+from .serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,16 @@
+"""JSON encoding shared by the backend (orjson)."""
+from typing import Any, Callable
+
+import orjson
+
+loads = orjson.loads
+
+
+def dumps(obj: Any, default: Callable = list, sort_keys: bool = False) -> bytes:
+    """Encode obj as compact JSON bytes.
+
+    Values orjson can't encode go through default; the list default covers
+    the deques and sets kept in memory. Non-string dict keys are stringified.
+    """
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return orjson.dumps(obj, default=default, option=option)
@@ -0,0 +1,74 @@
+import asyncio
+from ..agents import manager as agent_manager
+
+# Most items handed to an agent in one run_agent_batch call
+DISPATCH_BATCH_SIZE = 64
+
+
+class BatchDispatcher:
+    """Coalesces agent calls from all running pipelines into batched calls.
+
+    submit() queues items per agent and wakes the drain task. Everything
+    queued by the time it runs goes out together (split into batches of
+    DISPATCH_BATCH_SIZE), so batches form under load without a flush timer.
+    """
+
+    def __init__(self, batch_size=DISPATCH_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pending = {}  # agent name -> [(future, job_id, payload)]
+        self._wakeup = asyncio.Event()
+        self._drainer = None
+        self._inflight = set()
+        # agent entry points, bound once
+        self._wait_if_paused = agent_manager.wait_if_paused
+        self._run_agent_batch = agent_manager.run_agent_batch
+
+    def start(self):
+        self._drainer = asyncio.create_task(self._drain())
+
+    async def close(self):
+        if self._drainer:
+            self._drainer.cancel()
+        for task in list(self._inflight):
+            task.cancel()
+        for items in self._pending.values():
+            for fut, _, _ in items:
+                fut.cancel()
+        self._pending.clear()
+
+    async def submit(self, name, job_id, payloads):
+        """Run agent `name` over payloads for job_id; results in order."""
+        await self._wait_if_paused(job_id)
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in payloads]
+        self._pending.setdefault(name, []).extend(
+            (fut, job_id, payload) for fut, payload in zip(futures, payloads)
+        )
+        self._wakeup.set()
+        return await asyncio.gather(*futures)
+
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            for name, items in pending.items():
+                for i in range(0, len(items), self.batch_size):
+                    task = asyncio.create_task(self._dispatch(name, items[i:i + self.batch_size]))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, name, items):
+        try:
+            results = await self._run_agent_batch(name, [(job_id, p) for _, job_id, p in items])
+            for (fut, _, _), result in zip(items, results):
+                if not fut.done():
+                    fut.set_result(result)
+        except Exception as e:
+            for fut, _, _ in items:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            # cancelled at shutdown: don't leave submitters waiting
+            for fut, _, _ in items:
+                fut.cancel()
@@ -1,59 +1,344 @@
 import asyncio
-import uuid
-import json
+import base64
+import hashlib
 from ..agents import manager as agent_manager
+from .dispatcher import BatchDispatcher
+from ..utils.serialization import dumps as _dumps, loads as _loads
 import redis.asyncio as aioredis
 import os
+import time
+
+def _canonical(obj):
+    return _dumps(obj, sort_keys=True)
 
 REDIS_URL = os.getenv('REDIS_URL','redis://redis:6379/0')
 
+# Job state lives in Redis (one hash per job, job:{id}) so every API worker
+# sees the same jobs and state survives a restart. Started jobs are pushed to
+# JOB_QUEUE and picked up by whichever worker pops them first.
+JOB_QUEUE = 'jobs:queue'
+
+# A start request for a repo_url + options that already has a queued or
+# running job returns that job instead of starting another. The marker key
+# repo:{fingerprint}:job is removed when the job ends.
+DEDUP_TTL = 3600
+
+# Finished (completed or failed) job hashes expire after this many seconds
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 24 * 3600))
+
+# Every state change is also published on jobs:{id}, so clients can follow a
+# job (see events()) instead of polling status().
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# pause/resume requests are broadcast here; the worker running the job holds
+# its agent calls until resumed (calls already in flight finish).
+CONTROL_CHANNEL = 'jobs:control'
+
+# The mermaid flow is generated on first request for a completed job and
+# stored in its hash; a short-lived lock keeps workers from generating it twice.
+MERMAID_LOCK_TTL = 30
+
+# Stages after ingest, with the progress reported once each has drained.
+# Stages are connected by bounded queues so a downstream agent starts on a
+# chunk as soon as the upstream one has produced it.
+PIPELINE_STAGES = (('metadata', 0.5), ('summarizer', 0.8), ('docgen', 1.0))
+STAGE_QUEUE_SIZE = 8
+# Agent calls in flight per stage (options['concurrency']). Chunks arriving
+# while calls are in flight are folded into the next call, up to
+# STAGE_BATCH_SIZE per call, instead of waiting on a batching timer.
+STAGE_CONCURRENCY = 16
+STAGE_BATCH_SIZE = 32
+_DONE = object()  # end-of-stream marker passed down the stage queues
+
+
+# Crockford base32 (as used by ULIDs) via the C base32 encoder: translate
+# maps its RFC 4648 alphabet onto Crockford's.
+_ULID_TABLE = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567', b'0123456789ABCDEFGHJKMNPQRSTVWXYZ')
+
+
+def _new_job_id():
+    """Return a ULID: 48-bit millisecond timestamp + 80 random bits, as
+    26 base32 characters. Ids sort by creation time."""
+    raw = (time.time_ns() // 1_000_000).to_bytes(6, 'big') + os.urandom(10)
+    # 16 bytes = 128 bits; left-pad to 160 bits so the last 26 characters
+    # are exactly the 130-bit (2 leading zero bits) ULID encoding
+    return base64.b32encode(bytes(4) + raw)[6:].translate(_ULID_TABLE).decode()
+
+
+def _job_key(job_id):
+    return f'job:{job_id}'
+
+
+def _events_channel(job_id):
+    return f'jobs:{job_id}'
+
+
+def _dedup_key(repo_url, options):
+    digest = hashlib.blake2b(_canonical([repo_url, options]), digest_size=16).hexdigest()
+    return f'repo:{digest}:job'
+
+
 class Orchestrator:
     def __init__(self, app):
         self.app = app
-        self.jobs = {}
         self.redis = None
+        self._supervisor_task = None
+        self._control_task = None
+        self._active = set()  # ids of jobs running in this process
+        self._dispatcher = BatchDispatcher()
+        # agent entry points, bound once
+        self._run_agent = agent_manager.run_agent
+        self._get_mermaid = agent_manager.get_mermaid
+        self._pause = agent_manager.pause_job
+        self._resume = agent_manager.resume_job
+        self._clear_controls = agent_manager.clear_job
 
     async def startup(self):
-        self.redis = await aioredis.from_url(REDIS_URL)
+        self.redis = await aioredis.from_url(
+            REDIS_URL, decode_responses=True, socket_keepalive=True, health_check_interval=30
+        )
+        # connect now rather than on the first job update; the rest of the
+        # API works without Redis, so a failure here is only reported
+        try:
+            await self.redis.ping()
+        except aioredis.RedisError as e:
+            print(f'[ORCHESTRATOR] Redis unavailable at startup: {e}')
+        self._dispatcher.start()
+        self._supervisor_task = asyncio.create_task(self._supervisor())
+        self._control_task = asyncio.create_task(self._control_listener())
         # placeholder for langgraph init
         print('Orchestrator started')
 
     async def shutdown(self):
+        if self._control_task:
+            self._control_task.cancel()
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+            try:
+                await self._supervisor_task
+            except asyncio.CancelledError:
+                pass
+        await self._dispatcher.close()
         if self.redis:
             await self.redis.close()
 
     async def start_job(self, repo_url: str, options: dict):
-        job_id = str(uuid.uuid4())
-        self.jobs[job_id] = {'status':'queued','progress':0.0, 'mermaid':''}
-        # schedule the orchestrated pipeline
-        asyncio.create_task(self._run_pipeline(job_id, repo_url, options))
+        job_id = _new_job_id()
+        key = _job_key(job_id)
+        dedup_key = _dedup_key(repo_url, options)
+        # the job hash is written before the marker, so a marker always
+        # points at an existing job
+        await self.redis.hset(key, mapping={'status':'queued','progress':'0','mermaid':''})
+        if not await self.redis.set(dedup_key, job_id, nx=True, ex=DEDUP_TTL):
+            existing = await self.redis.get(dedup_key)
+            status = existing and await self.redis.hget(_job_key(existing), 'status')
+            if status and status not in TERMINAL_STATUSES:
+                async with self.redis.pipeline(transaction=False) as p:
+                    p.expire(dedup_key, DEDUP_TTL)
+                    p.delete(key)
+                    await p.execute()
+                return existing
+            # stale marker (job expired or ended without clearing it)
+            await self.redis.set(dedup_key, job_id, ex=DEDUP_TTL)
+        await self.redis.rpush(JOB_QUEUE, _dumps({'job_id':job_id, 'repo_url':repo_url, 'options':options}))
         return job_id
 
+    async def _supervisor(self):
+        # Jobs run as children of one TaskGroup: they are referenced until
+        # they finish and are all cancelled when the supervisor is.
+        async with asyncio.TaskGroup() as tg:
+            while True:
+                try:
+                    _, raw = await self.redis.blpop(JOB_QUEUE)
+                except aioredis.RedisError as e:
+                    print(f'[ORCHESTRATOR] Job queue unavailable: {e}')
+                    await asyncio.sleep(1)
+                    continue
+                try:
+                    job = _loads(raw)
+                    args = job['job_id'], job['repo_url'], job['options']
+                except Exception as e:
+                    print(f'[ORCHESTRATOR] Skipping malformed job {raw!r}: {e}')
+                    continue
+                tg.create_task(self._run_job(*args))
+
+    async def _control_listener(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(CONTROL_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    try:
+                        control = _loads(message['data'])
+                        if control['job_id'] not in self._active:
+                            continue
+                        if control['action'] == 'pause':
+                            await self._pause(control['job_id'])
+                        else:
+                            await self._resume(control['job_id'])
+                    except aioredis.RedisError:
+                        raise
+                    except Exception as e:
+                        print(f'[ORCHESTRATOR] Ignoring control message {message["data"]!r}: {e}')
+            except aioredis.RedisError as e:
+                print(f'[ORCHESTRATOR] Control channel unavailable: {e}')
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _run_job(self, job_id, repo_url, options):
+        # Nothing may escape this coroutine: an error raised into the
+        # supervisor's TaskGroup would cancel every other running job.
+        self._active.add(job_id)
+        try:
+            if await self.redis.hget(_job_key(job_id), 'status') == 'paused':
+                # paused while still queued
+                await self._pause(job_id)
+            else:
+                await self._update(job_id, status='running')
+            # the job's own TaskGroup keeps its failures inside this job
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._run_pipeline(job_id, repo_url, options))
+        except Exception as e:
+            # stage failures arrive wrapped in the pipeline's ExceptionGroups
+            while isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
+            print(f'[ORCHESTRATOR] Job {job_id} failed: {e}')
+            try:
+                await self._update(job_id, status='failed', error=str(e))
+            except Exception as e:
+                print(f'[ORCHESTRATOR] Could not record failure of job {job_id}: {e}')
+        finally:
+            self._active.discard(job_id)
+            self._clear_controls(job_id)
+            try:
+                async with self.redis.pipeline(transaction=False) as p:
+                    p.delete(_dedup_key(repo_url, options))
+                    p.expire(_job_key(job_id), JOB_RESULT_TTL)
+                    await p.execute()
+            except Exception as e:
+                print(f'[ORCHESTRATOR] Could not clean up job {job_id}: {e}')
+
+    async def _update(self, job_id, **fields):
+        # the (large) mermaid text is left out of the published event
+        event = {k: v for k, v in fields.items() if k != 'mermaid'}
+        async with self.redis.pipeline(transaction=False) as p:
+            p.hset(_job_key(job_id), mapping={k: str(v) for k, v in fields.items()})
+            p.publish(_events_channel(job_id), _dumps(event))
+            await p.execute()
+
     async def _run_pipeline(self, job_id, repo_url, options):
-        self.jobs[job_id]['status'] = 'running'
-        # Step 1: Preprocess (agent)
-        await agent_manager.run_agent('ingest', job_id, {'repo_url':repo_url})
-        self.jobs[job_id]['progress'] = 0.25
-        await agent_manager.run_agent('metadata', job_id, {})
-        self.jobs[job_id]['progress'] = 0.5
-        await agent_manager.run_agent('summarizer', job_id, {})
-        self.jobs[job_id]['progress'] = 0.8
-        await agent_manager.run_agent('docgen', job_id, {})
-        self.jobs[job_id]['progress'] = 1.0
-        # generate a mermaid flow
-        self.jobs[job_id]['mermaid'] = await agent_manager.get_mermaid(job_id)
-        self.jobs[job_id]['status'] = 'completed'
+        concurrency = max(1, int(options.get('concurrency', STAGE_CONCURRENCY)))
+        queues = [asyncio.Queue(maxsize=STAGE_QUEUE_SIZE) for _ in PIPELINE_STAGES]
+        # a failing stage cancels the others and raises an ExceptionGroup
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._ingest(job_id, repo_url, queues[0]))
+            for i, (name, progress) in enumerate(PIPELINE_STAGES):
+                out_q = queues[i + 1] if i + 1 < len(queues) else None
+                tg.create_task(self._stage(job_id, name, queues[i], out_q, progress, concurrency))
+        # the last stage's progress goes out with the final status
+        last_stage, last_progress = PIPELINE_STAGES[-1]
+        await self._update(job_id, progress=last_progress, stage=last_stage, status='completed')
+
+    async def _ingest(self, job_id, repo_url, out_q):
+        # Step 1: Preprocess (agent). Each chunk it returns is streamed
+        # downstream; without chunks the next stage runs once, as before.
+        result = await self._run_agent('ingest', job_id, {'repo_url':repo_url})
+        for chunk in (result or {}).get('chunks') or [{}]:
+            await out_q.put(chunk)
+        await self._update(job_id, progress=0.25, stage='ingest')
+        await out_q.put(_DONE)
+
+    async def _stage(self, job_id, name, in_q, out_q, progress, concurrency):
+        pending = []
+        ready = asyncio.Event()
+        closed = False
+
+        async def reader():
+            nonlocal closed
+            while (item := await in_q.get()) is not _DONE:
+                pending.append(item)
+                ready.set()
+            closed = True
+            ready.set()
+
+        async def executor():
+            while True:
+                await ready.wait()
+                if not pending:
+                    if closed:
+                        return
+                    ready.clear()
+                    continue
+                batch = pending[:STAGE_BATCH_SIZE]
+                del pending[:STAGE_BATCH_SIZE]
+                if not pending and not closed:
+                    ready.clear()
+                results = await self._dispatcher.submit(name, job_id, batch)
+                if out_q is not None:
+                    for result in results:
+                        await out_q.put(result)
+
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(reader())
+            for _ in range(concurrency):
+                tg.create_task(executor())
+        if out_q is not None:
+            await self._update(job_id, progress=progress, stage=name)
+            await out_q.put(_DONE)
 
     async def pause(self, job_id):
-        await agent_manager.pause_job(job_id)
-        self.jobs[job_id]['status'] = 'paused'
+        await self._update(job_id, status='paused')
+        await self.redis.publish(CONTROL_CHANNEL, _dumps({'job_id':job_id, 'action':'pause'}))
 
     async def resume(self, job_id):
-        await agent_manager.resume_job(job_id)
-        self.jobs[job_id]['status'] = 'running'
+        await self._update(job_id, status='running')
+        await self.redis.publish(CONTROL_CHANNEL, _dumps({'job_id':job_id, 'action':'resume'}))
 
     async def status(self, job_id):
-        return self.jobs.get(job_id, {'status':'unknown', 'progress':0.0})
+        job = await self.redis.hgetall(_job_key(job_id))
+        if not job:
+            return {'status':'unknown', 'progress':0.0}
+        job['progress'] = float(job.get('progress') or 0)
+        return job
+
+    async def events(self, job_id):
+        """Yield the job's current state, then each published update until it ends."""
+        pubsub = self.redis.pubsub()
+        # subscribe before reading the state so no transition is missed
+        await pubsub.subscribe(_events_channel(job_id))
+        try:
+            state = await self.status(job_id)
+            yield state
+            if state['status'] in TERMINAL_STATUSES or state['status'] == 'unknown':
+                return
+            async for message in pubsub.listen():
+                if message['type'] != 'message':
+                    continue
+                update = _loads(message['data'])
+                yield update
+                if update.get('status') in TERMINAL_STATUSES:
+                    return
+        finally:
+            await pubsub.aclose()
 
     async def get_mermaid(self, job_id):
-        return self.jobs.get(job_id, {}).get('mermaid','')
+        key = _job_key(job_id)
+        status, mermaid = await self.redis.hmget(key, 'status', 'mermaid')
+        if mermaid or status != 'completed':
+            return mermaid or ''
+        lock = f'{key}:mermaid:lock'
+        while not await self.redis.set(lock, '1', nx=True, ex=MERMAID_LOCK_TTL):
+            # another request is generating it
+            await asyncio.sleep(0.1)
+            mermaid = await self.redis.hget(key, 'mermaid')
+            if mermaid:
+                return mermaid
+        try:
+            mermaid = await self._get_mermaid(job_id)
+            await self.redis.hset(key, 'mermaid', mermaid)
+        finally:
+            await self.redis.delete(lock)
+        return mermaid
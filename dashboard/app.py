@@ -1,40 +1,72 @@
 """Multi-Agent Code Analysis Dashboard with Auth."""
+import atexit
+import functools
+import logging
 import os
+import re
+import threading
+import time
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import httpx
+import orjson
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from urllib.parse import quote_plus
 
 API_URL = os.getenv('API_URL', 'http://localhost:8000')
 
-st.set_page_config(page_title='Multi-Agent Dashboard', layout='wide', initial_sidebar_state='expanded')
+logger = logging.getLogger(__name__)
+
+def _json(resp):
+    """Parse a JSON response body straight from bytes."""
+    return orjson.loads(resp.content)
+
 
 # ============ Session State ============
-if 'token' not in st.session_state:
-    st.session_state.token = None
-if 'user_id' not in st.session_state:
-    st.session_state.user_id = None
-if 'user_email' not in st.session_state:
-    st.session_state.user_email = None
-if 'user_name' not in st.session_state:
-    st.session_state.user_name = None
-if 'user_role' not in st.session_state:
-    st.session_state.user_role = None
-if 'page' not in st.session_state:
-    st.session_state.page = 'login'  # login, signup, dashboard
-if 'selected_project' not in st.session_state:
-    st.session_state.selected_project = None
+_SESSION_DEFAULTS = (
+    ('token', None),
+    ('user_id', None),
+    ('user_email', None),
+    ('user_name', None),
+    ('user_role', None),
+    ('page', 'login'),  # login, signup, dashboard
+    ('selected_project', None),
+)
+for _key, _default in _SESSION_DEFAULTS:
+    st.session_state.setdefault(_key, _default)
+
+# One set_page_config per run, before any other st.* call; auth pages are centered
+_PAGE_CONFIGS = {
+    'login': ('Log In - Code Analysis', 'centered'),
+    'signup': ('Sign Up - Code Analysis', 'centered'),
+}
+_page_title, _page_layout = _PAGE_CONFIGS.get(st.session_state.page, ('Multi-Agent Dashboard', 'wide'))
+st.set_page_config(page_title=_page_title, layout=_page_layout, initial_sidebar_state='expanded')
+
+
+@functools.lru_cache(maxsize=8)
+def _bearer(token):
+    # Shared between callers: treat the returned dict as read-only
+    return {"Authorization": f"Bearer {token}"}
 
 
 def get_auth_header():
     """Get Authorization header with token."""
     if st.session_state.token:
-        return {"Authorization": f"Bearer {st.session_state.token}"}
+        return _bearer(st.session_state.token)
     return {}
 
 def logout_and_redirect(msg: str = "Session expired. Please log in again."):
     """Clear session and redirect to login with a message."""
     st.warning(msg)
+    _fetch_views_cached.clear()
+    _fetch_search.clear()
+    _fetch_chunk_list.clear()
+    _fetch_chunk_content.clear()
     st.session_state.token = None
     st.session_state.user_id = None
     st.session_state.user_email = None
@@ -44,13 +76,239 @@ def logout_and_redirect(msg: str = "Session expired. Please log in again."):
     st.rerun()
 
 
+# ============ API Client ============
+
+# Most GET bodies the client keeps for If-None-Match revalidation
+ETAG_CACHE_SIZE = 256
+
+
+class _ETagTransport(httpx.BaseTransport):
+    """Revalidates GETs with If-None-Match and replays the stored body on 304.
+
+    Entries are keyed on URL and Authorization, so users never share bodies.
+    """
+
+    # Describe the stored (already decoded) body, not the original wire form
+    _DROP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, transport, max_entries=ETAG_CACHE_SIZE):
+        self._transport = transport
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # (url, authorization) -> (etag, headers, body)
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        if request.method != 'GET':
+            return self._transport.handle_request(request)
+        key = (str(request.url), request.headers.get('authorization'))
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and 'if-none-match' not in request.headers:
+            request.headers['If-None-Match'] = entry[0]
+
+        response = self._transport.handle_request(request)
+        if response.status_code == 304 and entry:
+            response.close()
+            with self._lock:
+                self._entries.move_to_end(key)
+            return httpx.Response(200, headers=entry[1], content=entry[2], request=request)
+
+        etag = response.headers.get('etag')
+        if response.status_code == 200 and etag:
+            body = response.read()
+            headers = [(k, v) for k, v in response.headers.items() if k not in self._DROP_HEADERS]
+            with self._lock:
+                self._entries[key] = (etag, headers, body)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+@st.cache_resource
+def api_client():
+    """One pooled client per server process, so API calls reuse connections
+    instead of opening a new one per request."""
+    transport = httpx.HTTPTransport(
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    )
+    client = httpx.Client(base_url=API_URL, timeout=10, transport=_ETagTransport(transport))
+    atexit.register(client.close)
+    return client
+
+
+# Large ZIPs on slow links: no read deadline, generous write deadline
+UPLOAD_TIMEOUT = httpx.Timeout(connect=10, read=None, write=300, pool=10)
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Auth submits this soon after the previous one are dropped (seconds)
+SUBMIT_DEBOUNCE = 1.5
+
+
+def _submit_too_soon():
+    """True if an auth form was submitted within SUBMIT_DEBOUNCE; else record this one."""
+    now = time.monotonic()
+    if now - st.session_state.get('last_submit_ts', 0.0) < SUBMIT_DEBOUNCE:
+        return True
+    st.session_state.last_submit_ts = now
+    return False
+
+
+# Friendly messages for expected auth failures, by HTTP status
+_SIGNUP_ERRORS = {409: "❌ This email is already registered. Please log in instead."}
+_LOGIN_ERRORS = {401: "❌ Invalid email or password. Please try again."}
+
+
+def _error_detail(resp):
+    """The API's error detail, or the raw body if it isn't JSON."""
+    try:
+        return _json(resp).get("detail") or resp.text
+    except ValueError:
+        return resp.text
+
+
+# ============ Cached API Reads ============
+# Streamlit reruns the whole script on every interaction (and every 2 s while
+# a project is analyzing), so read-only GETs are cached per token. Errors are
+# not cached, so a 401 still reaches the caller.
+
+def _get_json(token, path):
+    resp = api_client().get(path, headers=_bearer(token))
+    resp.raise_for_status()
+    return _json(resp)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_projects(token):
+    return _get_json(token, "/projects/")
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def _fetch_statuses(token):
+    return _get_json(token, "/projects/status")
+
+
+def _load_projects(token):
+    """The (long-cached) project list with current statuses merged in."""
+    projects = _fetch_projects(token)
+    statuses = {s['project_id']: s for s in _fetch_statuses(token)}
+    if statuses.keys() != {p['project_id'] for p in projects}:
+        # projects were added or removed elsewhere
+        _fetch_projects.clear()
+        projects = _fetch_projects(token)
+    return [{**p, **statuses.get(p['project_id'], {})} for p in projects]
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def _fetch_project(token, project_id):
+    return _get_json(token, f"/projects/{project_id}")
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_metadata(token, project_id):
+    return _get_json(token, f"/analysis/{project_id}/metadata")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _fetch_final_metadata(token, project_id, updated_at):
+    # A finished project's metadata only changes when it is re-analyzed,
+    # which bumps updated_at, so it is kept without a TTL
+    return _get_json(token, f"/analysis/{project_id}/metadata")
+
+
+# Shorter queries match too much to be useful and aren't sent
+MIN_SEARCH_QUERY_LEN = 3
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def _fetch_search(token, project_id, query, limit=10):
+    resp = api_client().get(
+        f"/analysis/{project_id}/search",
+        params={"query": query, "limit": limit},
+        headers=_bearer(token)
+    )
+    resp.raise_for_status()
+    return _json(resp)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_chunk_list(token, project_id, status):
+    # Names, paths and line ranges only; sources are fetched per chunk
+    return _get_json(token, f"/analysis/{project_id}/chunks?limit=15&fields=meta")
+
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _fetch_chunk_content(token, content_url, status):
+    return _get_json(token, content_url)
+
+
+class _ViewFetchFailed(Exception):
+    """Raised out of the cached fetch so partial results aren't cached."""
+
+    def __init__(self, results):
+        super().__init__("analysis view fetch failed")
+        self.results = results
+
+
+def _fetch_views(token, project_id, views, status):
+    """Analysis views (chunks, sde, pm) from the batched dashboard endpoint.
+
+    Returns {view: {"data": ...}} or {view: {"error": message}}.
+    """
+    try:
+        return _fetch_views_cached(token, project_id, views, status)
+    except _ViewFetchFailed as e:
+        return e.results
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_views_cached(token, project_id, views, status):
+    # The views only change when the project's status does, which is
+    # part of the key, so a full set of results is kept for an hour
+    try:
+        bundle = _get_json(token, f"/analysis/{project_id}/dashboard?include={','.join(views)}")
+    except Exception as e:
+        raise _ViewFetchFailed({view: {"error": str(e)} for view in views})
+    errors = bundle.get("errors", {})
+    results = {
+        view: {"error": errors[view]} if view in errors else {"data": bundle[view]}
+        for view in views
+    }
+    if errors:
+        raise _ViewFetchFailed(results)
+    return results
+
+
+def _view_data(results, view):
+    result = results[view]
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result["data"]
+
+
+def _bullets(items, title=None, numbered=False, empty="None detected"):
+    """Render an optionally titled list as one markdown element."""
+    marker = "1." if numbered else "-"
+    body = "\n".join(f"{marker} {item}" for item in items) or f"_{empty}_"
+    st.markdown(f"**{title}:**\n\n{body}" if title else body)
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _files_df(files):
+    """Important-files table from (name, type, size_kb, path) rows.
+
+    cache_resource hands back the same DataFrame without copying it.
+    """
+    return pd.DataFrame(files, columns=['File Name', 'Type', 'Size (KB)', 'Path'])
+
+
 # ============ Auth Pages ============
 
 def page_signup():
     """User signup page with enhanced UI."""
-    # Set up page styling
-    st.set_page_config(page_title='Sign Up - Code Analysis', layout='centered')
-    
     # Custom CSS for better styling
     st.markdown("""
     <style>
@@ -150,7 +408,7 @@ def page_signup():
                 if not name or len(name.strip()) < 2:
                     errors.append("❌ Please enter a valid name (at least 2 characters)")
                 
-                if not email or '@' not in email:
+                if not email or not _EMAIL_RE.match(email):
                     errors.append("❌ Please enter a valid email address")
                 
                 if not password or len(password) < 8:
@@ -165,26 +423,24 @@ def page_signup():
                 if errors:
                     for error in errors:
                         st.error(error)
+                elif _submit_too_soon():
+                    st.info("⏳ Already submitted, please wait a moment.")
                 else:
                     try:
-                        resp = httpx.post(
-                            f"{API_URL}/auth/signup",
+                        resp = api_client().post(
+                            "/auth/signup",
                             json={"email": email, "password": password, "name": name},
                             timeout=10
                         )
                         resp.raise_for_status()
-                        st.success("✅ Account created successfully! Redirecting to login...")
-                        st.balloons()
-                        import time
-                        time.sleep(1)
+                        st.session_state.toast = "✅ Account created successfully! Please log in."
                         st.session_state.page = 'login'
                         st.rerun()
+                    except httpx.HTTPStatusError as e:
+                        code = e.response.status_code
+                        st.error(_SIGNUP_ERRORS.get(code) or f"❌ Signup failed: {_error_detail(e.response)}")
                     except httpx.HTTPError as e:
-                        error_msg = e.response.text if hasattr(e, 'response') else str(e)
-                        if 'already exists' in error_msg.lower():
-                            st.error("❌ This email is already registered. Please log in instead.")
-                        else:
-                            st.error(f"❌ Signup failed: {error_msg}")
+                        st.error(f"❌ Signup failed: {e}")
     
     # Login link
     st.markdown("---")
@@ -203,8 +459,6 @@ def page_signup():
 
 def page_login():
     """User login page with enhanced UI."""
-    st.set_page_config(page_title='Log In - Code Analysis', layout='centered')
-    
     # Custom CSS for authentication pages
     st.markdown("""
     <style>
@@ -366,17 +620,19 @@ def page_login():
                 if st.form_submit_button("🔓 Log In", use_container_width=True):
                     if not email or not password:
                         st.error("❌ Please enter both email and password")
-                    elif '@' not in email:
+                    elif not _EMAIL_RE.match(email):
                         st.error("❌ Please enter a valid email address")
+                    elif _submit_too_soon():
+                        st.info("⏳ Already submitted, please wait a moment.")
                     else:
                         try:
-                            resp = httpx.post(
-                                f"{API_URL}/auth/login",
+                            resp = api_client().post(
+                                "/auth/login",
                                 json={"email": email, "password": password},
                                 timeout=10
                             )
                             resp.raise_for_status()
-                            data = resp.json()
+                            data = _json(resp)
                             
                             st.session_state.token = data["access_token"]
                             st.session_state.user_id = data["user_id"]
@@ -385,13 +641,13 @@ def page_login():
 
                             # Fetch full user info (name, verified email/role)
                             try:
-                                me_resp = httpx.get(
-                                    f"{API_URL}/auth/me",
+                                me_resp = api_client().get(
+                                    "/auth/me",
                                     headers=get_auth_header(),
                                     timeout=10
                                 )
                                 me_resp.raise_for_status()
-                                me = me_resp.json()
+                                me = _json(me_resp)
                                 st.session_state.user_name = me.get("name") or None
                                 st.session_state.user_email = me.get("email") or email
                                 st.session_state.user_role = me.get("role") or data["role"]
@@ -399,19 +655,15 @@ def page_login():
                                 # Fallback name from email prefix
                                 st.session_state.user_name = (email.split("@")[0].replace(".", " ").title() if email else None)
                             
-                            st.success("✅ Logged in successfully!")
-                            st.balloons()
+                            st.session_state.toast = "✅ Logged in successfully!"
                             st.session_state.page = 'dashboard'
-                            import time
-                            time.sleep(0.5)
                             st.rerun()
                         
+                        except httpx.HTTPStatusError as e:
+                            code = e.response.status_code
+                            st.error(_LOGIN_ERRORS.get(code) or f"❌ Login failed: {_error_detail(e.response)}")
                         except httpx.HTTPError as e:
-                            error_msg = e.response.text if hasattr(e, 'response') else str(e)
-                            if '401' in str(e.response.status_code if hasattr(e, 'response') else ''):
-                                st.error("❌ Invalid email or password. Please try again.")
-                            else:
-                                st.error(f"❌ Login failed: {error_msg}")
+                            st.error(f"❌ Login failed: {e}")
         
         # Footer
         st.markdown("---")
@@ -427,6 +679,103 @@ def page_login():
             st.rerun()
 
 
+def _project_forms():
+    """Sidebar tabs for creating a project from a GitHub URL or a ZIP."""
+    # Tabs for project creation methods
+    tab1, tab2 = st.tabs(["🔗 GitHub URL", "📤 Upload ZIP"])
+
+    with tab1:
+        st.subheader("GitHub Repository")
+
+        with st.form("create_project_form"):
+            project_name = st.text_input("Project Name", placeholder="My Awesome Project")
+            repo_url = st.text_input("GitHub URL", placeholder="https://github.com/user/repo")
+
+            personas = st.multiselect(
+                "Generate docs for:",
+                options=["sde", "pm"],
+                default=["sde"],
+                help="SDE = Software Dev Engineer, PM = Product Manager"
+            )
+
+            description = st.text_area(
+                "Description (optional)",
+                placeholder="Brief description of the project..."
+            )
+
+            if st.form_submit_button("Create Project", use_container_width=True):
+                if not project_name or not repo_url:
+                    st.error("Project name and repository URL are required")
+                else:
+                        try:
+                            with st.spinner("Creating project and starting analysis..."):
+                                resp = api_client().post(
+                                    "/projects/",
+                                    json={
+                                        "name": project_name,
+                                        "repository_url": repo_url,
+                                        "personas": personas,
+                                        "description": description
+                                    },
+                                    headers=get_auth_header(),
+                                    timeout=10
+                                )
+                            resp.raise_for_status()
+                            data = _json(resp)
+                            _fetch_projects.clear()
+                            st.success(f"✓ Project created! Starting analysis...")
+                            st.rerun()
+                        except httpx.HTTPStatusError as e:
+                            if e.response.status_code == 401:
+                                logout_and_redirect("Session expired. Please log in again.")
+                            else:
+                                st.error(f"Failed to create project: {_error_detail(e.response)}")
+                        except httpx.HTTPError as e:
+                            st.error(f"Failed to create project: {e}")
+
+    with tab2:
+        st.subheader("Upload ZIP File")
+
+        with st.form("upload_project_form"):
+            zip_file = st.file_uploader("Select ZIP file", type=['zip'])
+            upload_project_name = st.text_input("Project Name", placeholder="My Project", key="upload_name")
+
+            upload_personas = st.multiselect(
+                "Generate docs for:",
+                options=["sde", "pm"],
+                default=["sde"],
+                key="upload_personas"
+            )
+
+            if st.form_submit_button("Upload & Analyze", use_container_width=True):
+                if not zip_file or not upload_project_name:
+                    st.error("ZIP file and project name are required")
+                else:
+                    try:
+                        with st.spinner("Uploading file and starting analysis..."):
+                            zip_file.seek(0)
+                            resp = api_client().post(
+                                "/projects/upload",
+                                # httpx streams the file object in chunks
+                                files={"file": (zip_file.name, zip_file, "application/zip")},
+                                data={"name": upload_project_name, "personas": upload_personas},
+                                headers=get_auth_header(),
+                                timeout=UPLOAD_TIMEOUT
+                            )
+                        resp.raise_for_status()
+                        data = _json(resp)
+                        _fetch_projects.clear()
+                        st.success(f"✓ Project created! Analysis starting...")
+                        st.rerun()
+                    except httpx.HTTPStatusError as e:
+                        if e.response.status_code == 401:
+                            logout_and_redirect("Session expired. Please log in again.")
+                        else:
+                            st.error(f"Upload failed: {_error_detail(e.response)}")
+                    except httpx.HTTPError as e:
+                        st.error(f"Upload failed: {e}")
+
+
 def page_dashboard():
     """Main dashboard page."""
     st.title("🚀 Multi-Agent Code Analysis Dashboard")
@@ -436,13 +785,13 @@ def page_dashboard():
         # Ensure name is loaded if token exists
         if st.session_state.token and not st.session_state.get("user_name"):
             try:
-                me_resp = httpx.get(
-                    f"{API_URL}/auth/me",
+                me_resp = api_client().get(
+                    "/auth/me",
                     headers=get_auth_header(),
                     timeout=10
                 )
                 me_resp.raise_for_status()
-                me = me_resp.json()
+                me = _json(me_resp)
                 st.session_state.user_name = me.get("name") or None
                 st.session_state.user_email = me.get("email") or st.session_state.user_email
                 st.session_state.user_role = me.get("role") or st.session_state.user_role
@@ -468,6 +817,10 @@ def page_dashboard():
                 st.caption(f"🛡️ Role: `{st.session_state.user_role}`")
         
         if st.button("🚪 Log Out", use_container_width=True):
+            _fetch_views_cached.clear()
+            _fetch_search.clear()
+            _fetch_chunk_list.clear()
+            _fetch_chunk_content.clear()
             st.session_state.token = None
             st.session_state.user_id = None
             st.session_state.user_email = None
@@ -478,96 +831,13 @@ def page_dashboard():
         
         st.divider()
         
-        # Tabs for project creation methods
-        tab1, tab2 = st.tabs(["🔗 GitHub URL", "📤 Upload ZIP"])
-        
-        with tab1:
-            st.subheader("GitHub Repository")
-            
-            with st.form("create_project_form"):
-                project_name = st.text_input("Project Name", placeholder="My Awesome Project")
-                repo_url = st.text_input("GitHub URL", placeholder="https://github.com/user/repo")
-                
-                personas = st.multiselect(
-                    "Generate docs for:",
-                    options=["sde", "pm"],
-                    default=["sde"],
-                    help="SDE = Software Dev Engineer, PM = Product Manager"
-                )
-                
-                description = st.text_area(
-                    "Description (optional)",
-                    placeholder="Brief description of the project..."
-                )
-                
-                if st.form_submit_button("Create Project", use_container_width=True):
-                    if not project_name or not repo_url:
-                        st.error("Project name and repository URL are required")
-                    else:
-                            try:
-                                with st.spinner("Creating project and starting analysis..."):
-                                    resp = httpx.post(
-                                        f"{API_URL}/projects/",
-                                        json={
-                                            "name": project_name,
-                                            "repository_url": repo_url,
-                                            "personas": personas,
-                                            "description": description
-                                        },
-                                        headers=get_auth_header(),
-                                        timeout=10
-                                    )
-                                resp.raise_for_status()
-                                data = resp.json()
-                                st.success(f"✓ Project created! Starting analysis...")
-                                st.rerun()
-                            except httpx.HTTPError as e:
-                                if hasattr(e, "response") and e.response is not None and e.response.status_code == 401:
-                                    logout_and_redirect("Session expired. Please log in again.")
-                                else:
-                                    error_detail = e.response.text if hasattr(e, 'response') else str(e)
-                                    st.error(f"Failed to create project: {error_detail}")
-        
-        with tab2:
-            st.subheader("Upload ZIP File")
-            
-            with st.form("upload_project_form"):
-                zip_file = st.file_uploader("Select ZIP file", type=['zip'])
-                upload_project_name = st.text_input("Project Name", placeholder="My Project", key="upload_name")
-                
-                upload_personas = st.multiselect(
-                    "Generate docs for:",
-                    options=["sde", "pm"],
-                    default=["sde"],
-                    key="upload_personas"
-                )
-                
-                if st.form_submit_button("Upload & Analyze", use_container_width=True):
-                    if not zip_file or not upload_project_name:
-                        st.error("ZIP file and project name are required")
-                    else:
-                        try:
-                            with st.spinner("Uploading file and starting analysis..."):
-                                resp = httpx.post(
-                                    f"{API_URL}/projects/upload",
-                                    files={"file": (zip_file.name, zip_file.getvalue(), "application/zip")},
-                                    headers={
-                                        **get_auth_header(),
-                                        "name": upload_project_name,
-                                        "personas": ",".join(upload_personas)
-                                    },
-                                    timeout=30
-                                )
-                            resp.raise_for_status()
-                            data = resp.json()
-                            st.success(f"✓ Project created! Analysis starting...")
-                            st.rerun()
-                        except httpx.HTTPError as e:
-                            if hasattr(e, "response") and e.response is not None and e.response.status_code == 401:
-                                logout_and_redirect("Session expired. Please log in again.")
-                            else:
-                                error_detail = e.response.text if hasattr(e, 'response') else str(e)
-                                st.error(f"Upload failed: {error_detail}")
+        if st.session_state.selected_project:
+            # Details view: no creation forms, just a way back
+            if st.button("← Projects", use_container_width=True, key="sidebar_back"):
+                st.session_state.selected_project = None
+                st.rerun()
+        else:
+            _project_forms()
     
     # Check if viewing project details
     if st.session_state.selected_project:
@@ -583,79 +853,174 @@ def page_dashboard():
         show_projects_list(get_auth_header)
 
 
+# Seconds between refreshes of the project cards while a project is analyzing
+PROJECTS_POLL_INTERVAL = 2
+# Finished projects whose details are warmed in the background
+PREFETCH_PROJECTS = 3
+# Seconds before a failed prefetch is tried again, doubling per failure up to the max
+PREFETCH_RETRY_DELAY = 30
+PREFETCH_RETRY_MAX = 600
+
+
 def show_projects_list(get_auth_header):
     """Show list of all projects."""
     st.subheader("Your Projects")
     
-    # Add auto-refresh for analyzing projects
-    any_analyzing = False
-    
     try:
         with st.spinner("Loading projects..."):
-            resp = httpx.get(
-                f"{API_URL}/projects/",
-                headers=get_auth_header(),
-                timeout=10
-            )
-        resp.raise_for_status()
-        projects = resp.json()
-        
-        if not projects:
-            st.info("📌 No projects yet. Create one in the sidebar to get started!")
-        else:
-            cols = st.columns(2)
-            for i, project in enumerate(projects):
-                with cols[i % 2]:
-                    with st.container(border=True):
-                        st.write(f"### {project['name']}")
-                        st.write(f"📌 ID: `{project['project_id']}`")
-                        
-                        # Show repo info
-                        if project['repository_url']:
-                            # Check if it's a ZIP upload (starts with "Uploaded ZIP:")
-                            if project['repository_url'].startswith('Uploaded ZIP:'):
-                                st.write(f"📦 {project['repository_url']}")
-                            else:
-                                st.write(f"🔗 GitHub: {project['repository_url']}")
-                        
-                        st.write(f"👥 Personas: {', '.join(project['personas']).upper()}")
-                        
-                        # Status badge with colors
-                        status = project['status']
-                        if status == 'analyzing':
-                            any_analyzing = True
-                            progress = project.get('progress', 0.0)
-                            status_msg = project.get('status_message', 'Analyzing...')
-                            
-                            st.info(f"⏳ Status: **{status.upper()}**")
-                            st.caption(f"📊 {status_msg}")
-                            st.progress(progress / 100.0, text=f"{int(progress)}%")
-                        elif status == 'completed':
-                            st.success(f"✓ Status: **{status.upper()}**")
-                        elif status == 'failed':
-                            st.error(f"✗ Status: **{status.upper()}**")
-                            if project.get('error'):
-                                st.caption(f"Error: {project['error']}")
-                        else:
-                            st.write(f"Status: **{status.upper()}**")
-                        
-                        st.caption(f"Created: {project['created_at'][:10]}")
-                        
-                        if st.button("View Details", key=f"btn_{project['project_id']}", use_container_width=True):
-                            st.session_state.selected_project = project['project_id']
-                            st.rerun()
-            
-            # Auto-refresh if any project is analyzing
-            if any_analyzing:
-                import time
-                time.sleep(2)  # Wait 2 seconds before refresh
-                st.rerun()
+            projects = _load_projects(st.session_state.token)
+    except httpx.HTTPError as e:
+        _projects_load_failed(e)
+        return
     
+    if not projects:
+        st.info("📌 No projects yet. Create one in the sidebar to get started!")
+    elif any(p['status'] == 'analyzing' for p in projects):
+        # Only the cards rerun, on a timer; idle lists are not polled at all
+        st.fragment(run_every=PROJECTS_POLL_INTERVAL)(_live_project_cards)()
+    else:
+        _project_cards(projects)
+    
+    _prefetch_details(st.session_state.token, projects)
+
+
+class _PrefetchAttempts:
+    """When each (token, project, version) may next be prefetched.
+
+    A warmed key is not tried again; failures back off exponentially.
+    """
+
+    def __init__(self):
+        self._next_try = {}  # key -> (monotonic time, failures)
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """Return True if key is due, holding it until finished() is called."""
+        now = time.monotonic()
+        with self._lock:
+            next_try, failures = self._next_try.get(key, (0.0, 0))
+            if next_try > now:
+                return False
+            self._next_try[key] = (float('inf'), failures)
+            return True
+
+    def finished(self, key, ok):
+        with self._lock:
+            _, failures = self._next_try[key]
+            if ok:
+                self._next_try[key] = (float('inf'), 0)
+            else:
+                delay = min(PREFETCH_RETRY_DELAY * 2 ** failures, PREFETCH_RETRY_MAX)
+                self._next_try[key] = (time.monotonic() + delay, failures + 1)
+
+
+@st.cache_resource
+def _prefetch_pool():
+    return ThreadPoolExecutor(max_workers=PREFETCH_PROJECTS, thread_name_prefix="prefetch")
+
+
+@st.cache_resource
+def _prefetch_attempts():
+    return _PrefetchAttempts()
+
+
+def _prefetch_details(token, projects):
+    """Warm the details-page caches of the most recently updated finished
+    projects in the background, so opening one doesn't wait on the API.
+
+    Returns at once; projects already warmed or backing off are skipped.
+    """
+    finished = [p for p in projects if p['status'] == 'completed']
+    finished.sort(key=lambda p: p.get('updated_at') or '', reverse=True)
+    # The workers run under this script's context so st.cache_data calls
+    # behave as they do on the script thread
+    ctx = get_script_run_ctx()
+    attempts = _prefetch_attempts()
+    for project in finished[:PREFETCH_PROJECTS]:
+        key = (token, project['project_id'], project.get('updated_at'))
+        if attempts.claim(key):
+            _prefetch_pool().submit(_warm_project, ctx, key, token, project)
+
+
+def _warm_project(ctx, key, token, project):
+    add_script_run_ctx(threading.current_thread(), ctx)
+    project_id = project['project_id']
+    ok = False
+    try:
+        _fetch_final_metadata(token, project_id, project.get('updated_at'))
+        shown = tuple(p for p in ('sde', 'pm') if p in project.get('personas', []))
+        if shown:
+            _fetch_views(token, project_id, shown, project['status'])
+        ok = True
+    except Exception as e:
+        # Best effort: the details page fetches whatever is missing
+        logger.warning("Prefetch of project %s failed: %s", project_id, e)
+    finally:
+        _prefetch_attempts().finished(key, ok)
+
+
+def _live_project_cards():
+    """Project cards, refreshed every PROJECTS_POLL_INTERVAL seconds."""
+    try:
+        projects = _load_projects(st.session_state.token)
     except httpx.HTTPError as e:
-        if hasattr(e, "response") and e.response is not None and e.response.status_code == 401:
-            logout_and_redirect("Session expired. Please log in again.")
-        else:
-            st.error(f"Failed to load projects: {e}")
+        _projects_load_failed(e)
+        return
+    _project_cards(projects)
+    if not any(p['status'] == 'analyzing' for p in projects):
+        # Analysis finished: rerun the page so the timer is dropped
+        st.rerun()
+
+
+def _project_cards(projects):
+    """Render one card per project, two per row."""
+    cols = st.columns(2)
+    for i, project in enumerate(projects):
+        with cols[i % 2]:
+            with st.container(border=True):
+                st.write(f"### {project['name']}")
+                st.write(f"📌 ID: `{project['project_id']}`")
+                
+                # Show repo info
+                if project['repository_url']:
+                    # Check if it's a ZIP upload (starts with "Uploaded ZIP:")
+                    if project['repository_url'].startswith('Uploaded ZIP:'):
+                        st.write(f"📦 {project['repository_url']}")
+                    else:
+                        st.write(f"🔗 GitHub: {project['repository_url']}")
+                
+                st.write(f"👥 Personas: {', '.join(project['personas']).upper()}")
+                
+                # Status badge with colors
+                status = project['status']
+                if status == 'analyzing':
+                    progress = project.get('progress', 0.0)
+                    status_msg = project.get('status_message', 'Analyzing...')
+                    
+                    st.info(f"⏳ Status: **{status.upper()}**")
+                    st.caption(f"📊 {status_msg}")
+                    st.progress(progress / 100.0, text=f"{int(progress)}%")
+                elif status == 'completed':
+                    st.success(f"✓ Status: **{status.upper()}**")
+                elif status == 'failed':
+                    st.error(f"✗ Status: **{status.upper()}**")
+                    if project.get('error'):
+                        st.caption(f"Error: {project['error']}")
+                else:
+                    st.write(f"Status: **{status.upper()}**")
+                
+                st.caption(f"Created: {project['created_at'][:10]}")
+                
+                if st.button("View Details", key=f"btn_{project['project_id']}", use_container_width=True):
+                    st.session_state.selected_project = project['project_id']
+                    st.rerun()
+
+
+def _projects_load_failed(e):
+    if hasattr(e, "response") and e.response is not None and e.response.status_code == 401:
+        logout_and_redirect("Session expired. Please log in again.")
+    else:
+        st.error(f"Failed to load projects: {e}")
 
 
 def show_project_details(project_id: str, get_auth_header):
@@ -663,13 +1028,7 @@ def show_project_details(project_id: str, get_auth_header):
     try:
         # Get project info
         with st.spinner("Loading project details..."):
-            project_resp = httpx.get(
-                f"{API_URL}/projects/{project_id}",
-                headers=get_auth_header(),
-                timeout=10
-            )
-        project_resp.raise_for_status()
-        project = project_resp.json()
+            project = _fetch_project(st.session_state.token, project_id)
         
         st.title(f"📊 {project['name']}")
         
@@ -683,13 +1042,10 @@ def show_project_details(project_id: str, get_auth_header):
         with st.expander("🔍 Repository Intelligence", expanded=True):
             try:
                 with st.spinner("Loading repository intelligence..."):
-                    meta_resp = httpx.get(
-                        f"{API_URL}/analysis/{project_id}/metadata",
-                        headers=get_auth_header(),
-                        timeout=10
-                    )
-                meta_resp.raise_for_status()
-                metadata = meta_resp.json()
+                    if project.get('status') in ('completed', 'failed'):
+                        metadata = _fetch_final_metadata(st.session_state.token, project_id, project.get('updated_at'))
+                    else:
+                        metadata = _fetch_metadata(st.session_state.token, project_id)
                 
                 col1, col2, col3 = st.columns(3)
                 
@@ -709,37 +1065,25 @@ def show_project_details(project_id: str, get_auth_header):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.write("**Detected Frameworks:**")
-                    for fw in metadata['frameworks']:
-                        st.write(f"• {fw.upper()}")
+                    _bullets((fw.upper() for fw in metadata['frameworks']), title="Detected Frameworks")
                 
                 with col2:
-                    st.write("**Entry Points:**")
-                    for ep in metadata['entry_points'][:5]:
-                        st.write(f"• {ep}")
+                    _bullets(islice(metadata['entry_points'], 5), title="Entry Points")
                 
                 # Important Files with Types
                 if metadata.get('important_files_with_types'):
                     st.write("**Important Files:**")
-                    files_df_data = []
-                    for file_info in metadata['important_files_with_types'][:15]:
-                        files_df_data.append({
-                            'File Name': file_info['name'],
-                            'Type': file_info.get('type', 'unknown'),
-                            'Size (KB)': file_info.get('size_kb', 0),
-                            'Path': file_info.get('path', '')
-                        })
-                    
-                    if files_df_data:
-                        import pandas as pd
-                        files_df = pd.DataFrame(files_df_data)
-                        st.dataframe(files_df, use_container_width=True, hide_index=True)
+                    files = tuple(
+                        (f['name'], f.get('type', 'unknown'), f.get('size_kb', 0), f.get('path', ''))
+                        for f in islice(metadata['important_files_with_types'], 15)
+                    )
+                    st.dataframe(_files_df(files), use_container_width=True, hide_index=True)
                 
                 # Dependencies
                 if metadata['dependencies']:
                     st.write("**Key Dependencies:**")
                     deps_cols = st.columns(2)
-                    for i, (pkg, ver) in enumerate(list(metadata['dependencies'].items())[:6]):
+                    for i, (pkg, ver) in enumerate(islice(metadata['dependencies'].items(), 6)):
                         with deps_cols[i % 2]:
                             st.write(f"`{pkg}` {ver}")
             
@@ -758,14 +1102,14 @@ def show_project_details(project_id: str, get_auth_header):
                     else:
                         try:
                             with st.spinner("Getting answer..."):
-                                ans_resp = httpx.post(
-                                    f"{API_URL}/analysis/{project_id}/ask",
+                                ans_resp = api_client().post(
+                                    f"/analysis/{project_id}/ask",
                                     headers=get_auth_header(),
                                     json={"question": q},
                                     timeout=20
                                 )
                             if ans_resp.status_code in (200, 202):
-                                ans = ans_resp.json()
+                                ans = _json(ans_resp)
                                 if ans_resp.status_code == 202:
                                     st.info(ans.get("detail") or "Analysis in progress")
                                 else:
@@ -796,8 +1140,8 @@ def show_project_details(project_id: str, get_auth_header):
                     else:
                         try:
                             with st.spinner("Adding context..."):
-                                ctx_resp = httpx.post(
-                                    f"{API_URL}/analysis/{project_id}/context",
+                                ctx_resp = api_client().post(
+                                    f"/analysis/{project_id}/context",
                                     headers=get_auth_header(),
                                     json={"instruction": instruction, "priority": priority},
                                     timeout=10
@@ -819,13 +1163,13 @@ def show_project_details(project_id: str, get_auth_header):
                 if st.button("Load Diagrams", use_container_width=True):
                     try:
                         with st.spinner("Loading diagrams..."):
-                            d_resp = httpx.get(
-                                f"{API_URL}/analysis/{project_id}/diagrams",
+                            d_resp = api_client().get(
+                                f"/analysis/{project_id}/diagrams",
                                 headers=get_auth_header(),
                                 timeout=15
                             )
                         d_resp.raise_for_status()
-                        diagrams = d_resp.json()
+                        diagrams = _json(d_resp)
                         for title, code in diagrams.items():
                             st.write(f"**{title.title()} Diagram**")
                             st.markdown("```mermaid\n" + code.strip() + "\n```")
@@ -837,14 +1181,14 @@ def show_project_details(project_id: str, get_auth_header):
                     if st.button("Export Markdown", use_container_width=True):
                         try:
                             with st.spinner("Preparing markdown export..."):
-                                ex = httpx.get(
-                                    f"{API_URL}/analysis/{project_id}/export",
+                                ex = api_client().get(
+                                    f"/analysis/{project_id}/export",
                                     params={"format": "md"},
                                     headers=get_auth_header(),
                                     timeout=20
                                 )
                             ex.raise_for_status()
-                            payload = ex.json()
+                            payload = _json(ex)
                             content = payload.get("content", "")
                             st.download_button(
                                 label="Download .md",
@@ -859,14 +1203,14 @@ def show_project_details(project_id: str, get_auth_header):
                     if st.button("Export PDF (demo)", use_container_width=True):
                         try:
                             with st.spinner("Preparing PDF export..."):
-                                ex = httpx.get(
-                                    f"{API_URL}/analysis/{project_id}/export",
+                                ex = api_client().get(
+                                    f"/analysis/{project_id}/export",
                                     params={"format": "pdf"},
                                     headers=get_auth_header(),
                                     timeout=20
                                 )
                             ex.raise_for_status()
-                            payload = ex.json()
+                            payload = _json(ex)
                             st.info(payload.get("note", "PDF export not available"))
                             content = payload.get("content", "")
                             if content:
@@ -882,32 +1226,22 @@ def show_project_details(project_id: str, get_auth_header):
         
         # Persona-Specific Analysis Section
         personas = project.get('personas', [])
+        shown = tuple(p for p in ('sde', 'pm') if p in personas)
         if len(personas) >= 2 or (len(personas) == 1 and personas[0] in ['sde', 'pm']):
             st.divider()
             st.subheader("📋 Persona-Specific Insights")
             
-            persona_tabs = []
-            if 'sde' in personas:
-                persona_tabs.append("SDE Analysis")
-            if 'pm' in personas:
-                persona_tabs.append("PM Analysis")
-            
-            if persona_tabs:
-                persona_tab_objs = st.tabs(persona_tabs)
+            if shown:
+                # Both personas' analyses come from one batched request
+                with st.spinner("Loading persona analysis..."):
+                    views = _fetch_views(st.session_state.token, project_id, shown, project.get('status'))
+                persona_tab_objs = dict(zip(shown, st.tabs([f"{p.upper()} Analysis" for p in shown])))
                 
                 # SDE Tab
-                if 'sde' in personas:
-                    sde_tab_index = persona_tabs.index("SDE Analysis")
-                    with persona_tab_objs[sde_tab_index]:
+                if 'sde' in persona_tab_objs:
+                    with persona_tab_objs['sde']:
                         try:
-                            with st.spinner("Loading SDE analysis..."):
-                                sde_resp = httpx.get(
-                                    f"{API_URL}/analysis/{project_id}/persona-analysis/sde",
-                                    headers=get_auth_header(),
-                                    timeout=15
-                                )
-                            sde_resp.raise_for_status()
-                            sde_analysis = sde_resp.json()
+                            sde_analysis = _view_data(views, 'sde')
                             
                             st.write("### 🛠️ Software Development Engineer Analysis")
                             st.write(sde_analysis.get('overview', ''))
@@ -943,40 +1277,28 @@ def show_project_details(project_id: str, get_auth_header):
                                 st.write(f"**Code Structure Rating:** {quality.get('code_structure_rating', 'N/A')}")
                                 st.write(f"**Dependency Health:** {quality.get('dependency_health', 'N/A')}")
                                 
-                                st.write("**Suggested Improvements:**")
-                                for improvement in quality.get('suggested_improvements', []):
-                                    st.write(f"• {improvement}")
+                                _bullets(quality.get('suggested_improvements', []), title="Suggested Improvements")
                             
                             # Recommendations
                             with st.expander("💡 SDE Recommendations"):
-                                for i, rec in enumerate(sde_analysis.get('recommendations', []), 1):
-                                    st.write(f"{i}. {rec}")
+                                _bullets(sde_analysis.get('recommendations', []), numbered=True)
                             
                             # Key Files
                             with st.expander("📂 Key Files for SDE"):
-                                key_files = sde_analysis.get('key_files', [])
-                                if key_files:
-                                    for f in key_files[:10]:
-                                        st.write(f"• **{f.get('name', 'N/A')}** ({f.get('type', 'unknown')})")
-                                else:
-                                    st.write("No specific key files identified")
+                                _bullets(
+                                    (f"**{f.get('name', 'N/A')}** ({f.get('type', 'unknown')})"
+                                     for f in islice(sde_analysis.get('key_files', ()), 10)),
+                                    empty="No specific key files identified"
+                                )
                         
                         except Exception as e:
                             st.error(f"Could not load SDE analysis: {e}")
                 
                 # PM Tab
-                if 'pm' in personas:
-                    pm_tab_index = persona_tabs.index("PM Analysis")
-                    with persona_tab_objs[pm_tab_index]:
+                if 'pm' in persona_tab_objs:
+                    with persona_tab_objs['pm']:
                         try:
-                            with st.spinner("Loading PM analysis..."):
-                                pm_resp = httpx.get(
-                                    f"{API_URL}/analysis/{project_id}/persona-analysis/pm",
-                                    headers=get_auth_header(),
-                                    timeout=15
-                                )
-                            pm_resp.raise_for_status()
-                            pm_analysis = pm_resp.json()
+                            pm_analysis = _view_data(views, 'pm')
                             
                             st.write("### 📊 Product Manager Analysis")
                             st.write(pm_analysis.get('overview', ''))
@@ -987,120 +1309,92 @@ def show_project_details(project_id: str, get_auth_header):
                                 
                                 col1, col2 = st.columns(2)
                                 with col1:
-                                    st.write("**Authentication:**")
-                                    auth = features.get('authentication', [])
-                                    if auth:
-                                        for a in auth:
-                                            st.write(f"• {a}")
-                                    else:
-                                        st.write("None detected")
+                                    _bullets(features.get('authentication', []), title="Authentication")
                                 
                                 with col2:
-                                    st.write("**Data Management:**")
-                                    data = features.get('data_management', [])
-                                    if data:
-                                        for d in data:
-                                            st.write(f"• {d}")
-                                    else:
-                                        st.write("None detected")
+                                    _bullets(features.get('data_management', []), title="Data Management")
                                 
-                                st.write("**API Endpoints:**")
-                                api = features.get('api_endpoints', [])
-                                if api:
-                                    for a in api:
-                                        st.write(f"• {a}")
+                                _bullets(features.get('api_endpoints', []), title="API Endpoints")
                             
                             # User Flows
                             with st.expander("👥 User Flows"):
                                 flows = pm_analysis.get('user_flows', {})
-                                st.write("**Primary Flows:**")
-                                for flow in flows.get('primary_flows', []):
-                                    st.write(f"• {flow}")
+                                _bullets(flows.get('primary_flows', []), title="Primary Flows")
                                 
-                                st.write("\n**Entry Mechanisms:**")
-                                for ep in flows.get('entry_mechanisms', [])[:5]:
-                                    st.write(f"• {ep}")
+                                _bullets(islice(flows.get('entry_mechanisms', ()), 5), title="Entry Mechanisms")
                             
                             # Business Logic
                             with st.expander("💼 Business Logic"):
                                 logic = pm_analysis.get('business_logic', {})
-                                st.write("**Core Functions:**")
-                                for func in logic.get('core_functions', [])[:5]:
-                                    st.write(f"• {func}")
+                                _bullets(islice(logic.get('core_functions', ()), 5), title="Core Functions")
                                 
-                                st.write("\n**Business Rules:**")
-                                for rule in logic.get('business_rules', []):
-                                    st.write(f"• {rule}")
+                                _bullets(logic.get('business_rules', []), title="Business Rules")
                             
                             # Scalability
                             with st.expander("📈 Scalability"):
                                 scale = pm_analysis.get('scalability', {})
                                 st.write(f"**Rating:** {scale.get('scalability_rating', 'N/A')}")
                                 
-                                st.write("\n**Bottlenecks:**")
-                                for b in scale.get('bottlenecks', []):
-                                    st.write(f"• {b}")
+                                _bullets(scale.get('bottlenecks', []), title="Bottlenecks")
                                 
-                                st.write("\n**Recommendations:**")
-                                for rec in scale.get('recommendations', []):
-                                    st.write(f"• {rec}")
+                                _bullets(scale.get('recommendations', []), title="Recommendations")
                             
                             # Recommendations
                             with st.expander("💡 PM Recommendations"):
-                                for i, rec in enumerate(pm_analysis.get('recommendations', []), 1):
-                                    st.write(f"{i}. {rec}")
+                                _bullets(pm_analysis.get('recommendations', []), numbered=True)
                             
                             # Stakeholders
                             with st.expander("👨‍💼 Stakeholders"):
-                                st.write("**Key Stakeholders:**")
-                                for stakeholder in pm_analysis.get('stakeholders', []):
-                                    st.write(f"• {stakeholder}")
+                                _bullets(pm_analysis.get('stakeholders', []), title="Key Stakeholders")
                         
                         except Exception as e:
                             st.error(f"Could not load PM analysis: {e}")
         
         # Code Chunks Section
-        with st.expander("📦 Code Chunks", expanded=False):
-            try:
-                with st.spinner("Loading code chunks..."):
-                    chunks_resp = httpx.get(
-                        f"{API_URL}/analysis/{project_id}/chunks?limit=15",
-                        headers=get_auth_header(),
-                        timeout=10
-                    )
-                chunks_resp.raise_for_status()
-                chunks_data = chunks_resp.json()
-                
-                st.write(f"Total Chunks: **{chunks_data['total_chunks']}**")
+        # Chunks are only fetched once asked for, then stay open for the project
+        chunks_key = f"chunks_open:{project_id}"
+        with st.expander("📦 Code Chunks", expanded=st.session_state.get(chunks_key, False)):
+            if not st.session_state.get(chunks_key):
+                if st.button("Load code chunks", key="load_chunks"):
+                    st.session_state[chunks_key] = True
+                    st.rerun()
+            else:
+                try:
+                    with st.spinner("Loading code chunks..."):
+                        chunks_data = _fetch_chunk_list(st.session_state.token, project_id, project.get('status'))
+                    
+                    st.write(f"Total Chunks: **{chunks_data['total_chunks']}**")
+                    
+                    # Only the chunks toggled open have their source fetched and sent
+                    for chunk in chunks_data['chunks']:
+                        with st.container(border=True):
+                            st.write(f"**{chunk['name']}** ({chunk['chunk_type']})")
+                            st.caption(f"{chunk['file_path']}:{chunk['start_line']}-{chunk['end_line']}")
+                            if st.toggle("View Code", key=f"code:{project_id}:{chunk['chunk_id']}"):
+                                code = _fetch_chunk_content(
+                                    st.session_state.token, chunk['content_url'], project.get('status')
+                                )
+                                st.code(code['content'], language=chunk['language'])
                 
-                for chunk in chunks_data['chunks']:
-                    with st.container(border=True):
-                        st.write(f"**{chunk['name']}** ({chunk['chunk_type']})")
-                        st.caption(f"{chunk['file_path']}:{chunk['start_line']}-{chunk['end_line']}")
-                        with st.expander("View Code"):
-                            st.code(chunk['content'], language=chunk['language'])
-            
-            except Exception as e:
-                st.warning(f"Could not load code chunks: {e}")
+                except Exception as e:
+                    st.warning(f"Could not load code chunks: {e}")
         
         # Code Search Section
         with st.expander("🔎 Code Search", expanded=False):
-            search_query = st.text_input(
-                "Search code",
-                placeholder="e.g., 'authentication', 'database', 'api endpoints'..."
-            )
+            # Only an explicit submit reruns the search
+            with st.form("search_form", clear_on_submit=False, border=False):
+                search_query = st.text_input(
+                    "Search code",
+                    placeholder="e.g., 'authentication', 'database', 'api endpoints'..."
+                ).strip()
+                st.form_submit_button("Search")
             
-            if search_query:
+            if search_query and len(search_query) < MIN_SEARCH_QUERY_LEN:
+                st.info(f"Enter at least {MIN_SEARCH_QUERY_LEN} characters to search.")
+            elif search_query:
                 try:
                     with st.spinner("Searching code..."):
-                        search_resp = httpx.get(
-                            f"{API_URL}/analysis/{project_id}/search",
-                            params={"query": search_query, "limit": 10},
-                            headers=get_auth_header(),
-                            timeout=10
-                        )
-                    search_resp.raise_for_status()
-                    search_data = search_resp.json()
+                        search_data = _fetch_search(st.session_state.token, project_id, search_query)
                     
                     st.write(f"Found **{search_data['total_results']}** results")
                     
@@ -1130,6 +1424,10 @@ def show_project_details(project_id: str, get_auth_header):
 
 # ============ Main App Logic ============
 
+# One-shot notice from the previous page (e.g. after login), shown once
+if _toast := st.session_state.pop('toast', None):
+    st.toast(_toast)
+
 if st.session_state.page == 'login':
     page_login()
 elif st.session_state.page == 'signup':
@@ -1,12 +1,15 @@
 # simple utility to create a demo JWT
 import os, time
-from jose import jwt
+from jose import jwk, jwt
 secret = os.getenv('JWT_SECRET','change-me')
+# HMAC key built once, as in backend/auth.py
+key = jwk.construct(secret, 'HS256')
+now = int(time.time())
 payload = {
     'sub':'demo_user',
     'role':'admin',
-    'iat': int(time.time()),
-    'exp': int(time.time()) + 3600
+    'iat': now,
+    'exp': now + 3600
 }
-token = jwt.encode(payload, secret, algorithm='HS256')
+token = jwt.encode(payload, key, algorithm='HS256')
 print(token)
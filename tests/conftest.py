@@ -0,0 +1,5 @@
+"""Shared pytest setup: make the backend package importable from the repo root."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,97 @@
+"""Analysis cache (LRU + TTL) and conditional (ETag) responses."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import analysis_routes
+from backend.agents.analyzer import CodeChunk
+from backend.schemas import UserRole
+from backend.services import user_service
+
+PROJECT_ID = "test-project"
+USER_ID = "test-user"
+
+
+def _entry():
+    chunk = CodeChunk(
+        chunk_id="main.py:1", file_path="main.py", chunk_type="function", name="main",
+        start_line=1, end_line=2, language="python", content="def main():\n    pass\n"
+    )
+    return (None, [chunk], None)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    analysis_routes._analysis_cache.clear()
+    analysis_routes._response_etags.clear()
+    analysis_routes._chunk_indexes.clear()
+    yield
+    analysis_routes._analysis_cache.clear()
+    analysis_routes._response_etags.clear()
+    analysis_routes._chunk_indexes.clear()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    archive = tmp_path / "repo.zip"
+    archive.write_bytes(b"")
+    monkeypatch.setitem(user_service.projects_db, PROJECT_ID, {
+        "project_id": PROJECT_ID,
+        "owner_id": USER_ID,
+        "status": "completed",
+        "repository_url": "",
+        "local_file_path": str(archive),
+        "content_sha256": "0" * 64,
+    })
+    # The disk cache holds the finished analysis
+    monkeypatch.setattr(analysis_routes, "load_analysis_cache", lambda project_id, digest: _entry())
+    app = FastAPI()
+    app.include_router(analysis_routes.router)
+    token = user_service.create_access_token(USER_ID, "test@example.com", UserRole.USER)
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as c:
+        yield c
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(analysis_routes, "_MAX_CACHED_PROJECTS", 2)
+    analysis_routes._cache_put("a", _entry())
+    analysis_routes._cache_put("b", _entry())
+    assert analysis_routes._cache_get("a") is not None  # "b" is now the oldest
+    analysis_routes._cache_put("c", _entry())
+    assert analysis_routes._cache_get("b") is None
+    assert analysis_routes._cache_get("a") is not None
+    assert analysis_routes._cache_get("c") is not None
+
+
+def test_cache_entry_expires_after_ttl(monkeypatch):
+    analysis_routes._cache_put("a", _entry())
+    analysis_routes._response_etags["a"] = {"metadata": '"etag"'}
+    monkeypatch.setattr(analysis_routes, "_CACHE_TTL", -1)
+    assert analysis_routes._cache_get("a") is None
+    assert "a" not in analysis_routes._analysis_cache
+    assert "a" not in analysis_routes._response_etags
+
+
+def test_evicted_project_still_serves_chunks(client, monkeypatch):
+    monkeypatch.setattr(analysis_routes, "_MAX_CACHED_PROJECTS", 1)
+    analysis_routes._cache_put(PROJECT_ID, _entry())
+    analysis_routes._cache_put("other", _entry())
+    assert analysis_routes._cache_get(PROJECT_ID) is None
+
+    r = client.get(f"/analysis/{PROJECT_ID}/chunks")
+    assert r.status_code == 200
+    assert r.json()["total_chunks"] == 1
+    assert r.json()["chunks"][0]["chunk_id"] == "main.py:1"
+
+
+def test_if_none_match_returns_304(client):
+    r = client.get(f"/analysis/{PROJECT_ID}/chunks")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+
+    r = client.get(f"/analysis/{PROJECT_ID}/chunks", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+
+    r = client.get(f"/analysis/{PROJECT_ID}/chunks", headers={"If-None-Match": '"stale"'})
+    assert r.status_code == 200
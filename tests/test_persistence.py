@@ -0,0 +1,32 @@
+"""JsonStore snapshot + change-log persistence."""
+from backend import persistence
+from backend.persistence import JsonStore
+
+
+def test_log_replay_skips_torn_last_line(tmp_path):
+    snapshot = tmp_path / "store.json"
+    snapshot.write_bytes(b'{"a":{"n":1},"b":{"n":2}}')
+    snapshot.with_suffix(".log").write_bytes(
+        b'{"op":"put","k":"c","v":{"n":3}}\n'
+        b'{"op":"del","k":"a"}\n'
+        b'{"op":"put","k":"b","v":{"n":'  # interrupted write
+    )
+
+    assert JsonStore(snapshot, "store").load() == {"b": {"n": 2}, "c": {"n": 3}}
+
+
+def test_saved_changes_survive_reload(tmp_path):
+    snapshot = tmp_path / "store.json"
+    store = JsonStore(snapshot, "store")
+    db = store.load()
+    db["a"] = {"n": 1}
+    db["b"] = {"n": 2}
+    store.save(db)
+    persistence.flush_pending_writes()
+
+    del db["a"]
+    db["b"]["n"] = 3
+    store.save(db, keys=["a", "b"])
+    persistence.flush_pending_writes()
+
+    assert JsonStore(snapshot, "store").load() == {"b": {"n": 3}}
@@ -0,0 +1,41 @@
+"""Password hashing and login."""
+import asyncio
+import hashlib
+
+from backend.services import user_service
+
+EMAIL = "legacy@example.com"
+PASSWORD = "correct horse"
+
+
+def test_legacy_sha256_login_rehashes_with_scrypt(monkeypatch):
+    user = {
+        "user_id": "legacy-user",
+        "email": EMAIL,
+        "role": "user",
+        "password": hashlib.sha256(PASSWORD.encode()).hexdigest(),
+    }
+    monkeypatch.setitem(user_service.users_db, EMAIL, user)
+    saved = []
+    monkeypatch.setattr(user_service, "save_users_db", saved.append)
+
+    result = asyncio.run(user_service.login(EMAIL, PASSWORD))
+
+    assert result["user_id"] == "legacy-user"
+    assert user["password"].startswith("scrypt$")
+    assert not user_service.password_needs_rehash(user["password"])
+    assert user_service.verify_password(PASSWORD, user["password"])
+    assert saved == [user_service.users_db]
+
+
+def test_current_hash_is_not_rewritten(monkeypatch):
+    hashed = user_service.hash_password(PASSWORD)
+    user = {"user_id": "current-user", "email": EMAIL, "role": "user", "password": hashed}
+    monkeypatch.setitem(user_service.users_db, EMAIL, user)
+    saved = []
+    monkeypatch.setattr(user_service, "save_users_db", saved.append)
+
+    asyncio.run(user_service.login(EMAIL, PASSWORD))
+
+    assert user["password"] == hashed
+    assert saved == []